@@ -1,5 +1,6 @@
 import discord
 import aiohttp
+from aiohttp import web
 import validators
 import traceback
 from discord.ext import commands
@@ -7,16 +8,30 @@ import cv2
 import numpy as np
 import asyncio
 import os
+import sys
 import json
 import tempfile
-import io
 import time
 import gc
 import psutil
-from typing import List, Optional, Dict
+import signal
+import heapq
+import bisect
+import sqlite3
+import threading
+import contextlib
+import functools
+import hashlib
+import math
+import shutil
+import random
+import ipaddress
+import types
+from typing import List, Optional
+from abc import ABC, abstractmethod
+from collections import deque
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from asyncio import Semaphore
 
 # Configuration
 load_dotenv()
@@ -27,13 +42,68 @@ RESULTS_CHANNEL_NAME = 'result-graph'
 ROLE_PING = '1379204201279782922' # ROTD ROLE ID
 CLIP_DATA_FILE = 'pending_clips.json'
 RESULTS_DATA_FILE = 'clip_results.json'
+SCORES_DATA_FILE = 'user_scores.json'
+DATA_DIR = 'data' # Per-guild shards live in data/<guild_id>/<data file name>
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower() # 'json' (per-guild shards) or 'sqlite'
+SQLITE_DB_FILE = os.getenv("SQLITE_DB_FILE", "gmr.sqlite3")
 video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']
-MAX_CONCURRENT_PROCESSING = 1 # Max threads to not blow ffmpeg 
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", "0")) # Parallel ffmpeg jobs, 0 = sized from CPU and RAM
+TRANSCODE_THREADS_PER_JOB = int(os.getenv("TRANSCODE_THREADS_PER_JOB", "0")) # ffmpeg -threads of each job, 0 = the cores split between the workers
+TRANSCODE_MIN_THREADS_PER_JOB = 2 # Cores a worker needs before another one is added
+TRANSCODE_JOB_MEMORY_MB = int(os.getenv("TRANSCODE_JOB_MEMORY_MB", "350")) # Free RAM a 1080p encode needs to be admitted
 MAX_FILE_SIZE_MB = 200
 TARGET_VIDEO_SIZE_MB = 25
-processing_semaphore = Semaphore(MAX_CONCURRENT_PROCESSING)
-processing_queue = [] # Tuple containing user_id / message of position
+FFMPEG_PROGRESS_INTERVAL = 10 # Seconds between progress edits of the user's message
+FFMPEG_STALL_TIMEOUT = 120 # Kill ffmpeg when it reports no progress for this long
+FFMPEG_LOG_TAIL_LINES = 40 # Only the end of ffmpeg's log is kept for error reports
+BLUR_ENGINE = os.getenv("BLUR_ENGINE", "legacy").lower() # 'legacy' (one overlay per region) or 'masked' (one pass per cluster of regions, see --check-blur)
+BLUR_EQUIVALENCE_TOLERANCE = 4 # --check-blur fails when the masked engine's luma differs from legacy by more than this
+BLUR_PROFILES_FILE = 'blur_profiles.json' # Normalized blur regions, see README
+BLUR_PROFILE = os.getenv("BLUR_PROFILE", "strinova")
+BLUR_CLUSTER_GAP = 64 # Regions closer than this (px) are blurred in the same pass
+MIN_VIDEO_DURATION = 2 # Seconds
+MAX_VIDEO_DURATION = 600 # Seconds, longer clips would hit the 30min processing timeout on the VPS
+ENCODE_SAMPLE_SECONDS = 3 # Length of the complexity test encode taken from the middle of the clip
+ENCODE_CRF_RANGE = (18, 30) # Quality bounds of the encoding planner
+ENCODE_MIN_VIDEO_KBPS = {1080: 800, 720: 500} # Below this the size target is given up for watchable quality
+SEGMENT_PARALLEL = os.getenv("SEGMENT_PARALLEL", "0") == "1" # Encode long clips as keyframe segments in parallel
+SEGMENT_MIN_DURATION = 120 # Seconds, shorter clips aren't worth the split and concat
+SEGMENT_MAX_PARALLEL = int(os.getenv("SEGMENT_MAX_PARALLEL", "4"))
+MEDIA_CACHE_DIR = 'cache' # Probe results and encoded outputs keyed by a hash of the input content
+MEDIA_CACHE_MAX_MB = int(os.getenv("MEDIA_CACHE_MAX_MB", "2048"))
+MEDIA_CACHE_MAX_ENTRIES = int(os.getenv("MEDIA_CACHE_MAX_ENTRIES", "200"))
+JOBS_DIR = 'jobs' # One JSON record per queued submission, resumed after a restart
+SUBMISSIONS_DIR = 'submissions' # Videos of queued submissions, kept out of the temp dir
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))
+HTTP_LIMIT_PER_HOST = int(os.getenv("HTTP_LIMIT_PER_HOST", "4")) # Per mirror/upload host, keeps bursts from hammering one site
+HTTP_KEEPALIVE = 60 # Seconds an idle connection stays open for the next request
+HTTP_DNS_CACHE_TTL = 300
+HTTP_USER_AGENT = "Mozilla/5.0"
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2")) # Uploads running at once, separate from the transcode slots
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "5"))
+UPLOAD_BACKOFF_BASE = 10 # Seconds before the first retry, doubled after every failed attempt
+UPLOAD_BACKOFF_MAX = 300
+UPLOAD_PARK_MINUTES = 30 # A clip whose upload failed every attempt is kept and tried again after this
+UPLOAD_PARK_MAX_HOURS = 48 # Then given up on, so a dead host can't fill the disk forever
+UPLOAD_BACKLOG = int(os.getenv("UPLOAD_BACKLOG", "4")) # Encoded clips waiting for upload before the encoders pause
+PIPELINE_VALIDATE_WORKERS = 2
+PIPELINE_POST_WORKERS = 2
+HOSTING_BACKENDS = [name.strip() for name in os.getenv("HOSTING_BACKENDS", "catbox").split(",") if name.strip()] # Tried in this order
+CATBOX_API_URL = 'https://catbox.moe/user/api.php'
+CATBOX_FILES_URL = 'https://files.catbox.moe/'
+HOSTING_DISCORD_CHANNEL_ID = int(os.getenv("HOSTING_DISCORD_CHANNEL_ID", "0")) # Dedicated storage channel, the discord backend is off without it
+LOCAL_HOSTING_DIR = 'hosted'
+LOCAL_HOSTING_HOST = os.getenv("LOCAL_HOSTING_HOST", "127.0.0.1")
+LOCAL_HOSTING_PORT = int(os.getenv("LOCAL_HOSTING_PORT", "8089"))
+LOCAL_HOSTING_MAX_AGE_HOURS = int(os.getenv("LOCAL_HOSTING_MAX_AGE_HOURS", "168")) # Hosted files older than this are deleted
+STREAM_CHUNK_SIZE = 64 * 1024 # Videos are copied in chunks of this size, never read whole into memory
+MEMCHECK_MAX_GROWTH_MB = 40 # --memcheck-approval fails when peak RSS grows more than this
+LOCAL_HOSTING_URL = os.getenv("LOCAL_HOSTING_URL", f"http://{LOCAL_HOSTING_HOST}:{LOCAL_HOSTING_PORT}") # Public base URL of the local server
 CHANNEL_CONFIG_FILE = 'channel_config.json'
+RESULTS_FLUSH_INTERVAL = 5 # Seconds between write-behind flushes of the results store
+RESULTS_FLUSH_BATCH = 50 # Flush early once this many updates are pending
+JOURNAL_DIR = 'journal' # Append-only vote journal, old segments are kept as an audit trail
+JOURNAL_COMPACT_INTERVAL = 600 # Seconds between folds of the vote journal into the results snapshot
 
 def log_memory_usage(stage: str):
     """Log current memory usage"""
@@ -60,11 +130,44 @@ POINTS_EXACT = 10
 POINTS_PER_RANK_OFF = -2
 STREAK_MULTIPLIER_BASE = 0.10
 
+class GuessRankBot(commands.Bot):
+    async def setup_hook(self):
+        # Runs once before the gateway connects, so no vote can hit an unloaded store
+        storage.migrate_legacy_files()
+        http.open()
+        await hosting.start()
+        results_store.load()
+        vote_journal.open(results_store.data)
+        expiry_scheduler.load(results_store.data)
+        self.pending_clips = load_pending_clips()
+        reaction_filter.rebuild(self.pending_clips)
+        job_queue.load()
+        results_store.start()
+        vote_journal.start()
+
+        # Flush pending writes when the host stops us (not available on Windows)
+        try:
+            self.loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    async def close(self):
+        await job_queue.close()
+        try:
+            await vote_journal.close()
+            await results_store.close()
+        except Exception as e:
+            print(f"❌ [STORE] Final flush failed: {e}")
+        storage.close()
+        await hosting.close()
+        await http.close()
+        await super().close()
+
 # Bot configuration
 intents = discord.Intents.default()
 intents.message_content = True
 intents.reactions = True
-bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
+bot = GuessRankBot(command_prefix='!', intents=intents, help_command=None)
 tree = bot.tree
 
 
@@ -201,6 +304,9 @@ class ChannelSetupModal(discord.ui.Modal):
                 except Exception as e:
                     await interaction.followup.send(f"❌ Error creating {results_channel_name}: {str(e)}", ephemeral=True)
                     return
+            
+            # Channels may have been created above, resolve them again on next use
+            channels.invalidate(interaction.guild.id)
                     
             await interaction.followup.send(
                 f"✅ Channels configured successfully:\n• #{check_channel_name}\n• #{guess_channel_name}\n• #{results_channel_name}",
@@ -219,6 +325,10 @@ class UnsupportedResolutionError(Exception):
         self.height = height
         super().__init__(f"Unsupported resolution: {width}x{height}")
 
+class InvalidVideoError(Exception):
+    """Submission rejected before queueing, the message is shown to the user"""
+    pass
+
 
 
 
@@ -233,30 +343,23 @@ class ResultsSelector(discord.ui.View):
         
         print(f"📊 [RESULTS] Loading results selector for guild {guild_id}")
         
-        results_data = load_results_data()
         finished_clips = []
         
-        if guild_id in results_data:
-            server_clips = results_data[guild_id]
-            for clip_id, clip_data in server_clips.items():
-                if clip_data.get('expired', False):
-                    end_time = datetime.fromisoformat(clip_data['end_time'])
-                    date_str = end_time.strftime("%Y-%m-%d %H:%M")
-                    rank_emoji = next((rank['emoji'] for rank in RANKS if rank['name'] == clip_data.get('correct_rank', '')), '🎮')
-                    
-                    finished_clips.append({
-                        'clip_id': clip_id,
-                        'date': date_str,
-                        'rank': clip_data.get('correct_rank', 'Unknown'),
-                        'emoji': rank_emoji,
-                        'votes': clip_data.get('total_votes', 0)
-                    })
+        # Already sorted newest first and limited to the 25 options a dropdown can hold
+        for clip in results_store.finished_clips(guild_id, limit=25):
+            end_time = datetime.fromisoformat(clip['end_time'])
+            date_str = end_time.strftime("%Y-%m-%d %H:%M")
+            rank_emoji = RANK_EMOJIS.get(clip['correct_rank'], '🎮')
             
-            print(f"    Found {len(finished_clips)} finished clips")
-        else:
-            print(f"    No clips data found for guild {guild_id}")
+            finished_clips.append({
+                'clip_id': clip['clip_id'],
+                'date': date_str,
+                'rank': clip['correct_rank'] or 'Unknown',
+                'emoji': rank_emoji,
+                'votes': clip['total_votes']
+            })
         
-        finished_clips.sort(key=lambda x: x['date'], reverse=True)
+        print(f"    Found {len(finished_clips)} finished clips")
         
         if not finished_clips:
             self.clip_select = discord.ui.Select(
@@ -267,8 +370,6 @@ class ResultsSelector(discord.ui.View):
             )
             self.clip_select.disabled = True
         else:
-            finished_clips = finished_clips[:25]
-            
             self.clip_select = discord.ui.Select(
                 placeholder="Select a clip to view results...",
                 min_values=1,
@@ -323,11 +424,12 @@ class ResultsSelector(discord.ui.View):
 ######################################
 
 class ServerSelector(discord.ui.View):
-    def __init__(self, user_id: int, video_path: str, available_servers: list):
+    def __init__(self, user_id: int, video_path: str, available_servers: list, content_key: str = None):
         super().__init__(timeout=300)
         self.user_id = user_id
         self.video_path = video_path
         self.available_servers = available_servers
+        self.content_key = content_key
         
         # Create dropdown with server options
         options = []
@@ -360,7 +462,7 @@ class ServerSelector(discord.ui.View):
         selected_server = self.available_servers[selected_index]
         
         # Now show rank selection for the chosen server
-        view = RankSelector(self.user_id, self.video_path, selected_server['guild'].id)
+        view = RankSelector(self.user_id, self.video_path, selected_server['guild'].id, self.content_key)
         
         embed = discord.Embed(
             title="🎮 Rank Selection",
@@ -378,12 +480,13 @@ class ServerSelector(discord.ui.View):
 ######################################
 
 class RankSelector(discord.ui.View):
-    def __init__(self, user_id: int, video_path: str, guild_id: int= None):
+    def __init__(self, user_id: int, video_path: str, guild_id: int= None, content_key: str = None):
         super().__init__(timeout=300)
         self.user_id = user_id
         self.video_path = video_path
         self.selected_rank = None
         self.guild_id = guild_id
+        self.content_key = content_key
         
         # Dropdown DMS
         self.rank_select = discord.ui.Select(
@@ -410,7 +513,7 @@ class RankSelector(discord.ui.View):
         self.selected_rank = self.rank_select.values[0]
         
         # Show blur selection view
-        view = BlurSelector(self.user_id, self.video_path, self.guild_id, self.selected_rank)
+        view = BlurSelector(self.user_id, self.video_path, self.guild_id, self.selected_rank, self.content_key)
         
         embed = discord.Embed(
             title="🎨 Blur Processing Options",
@@ -423,180 +526,16 @@ class RankSelector(discord.ui.View):
         )
         
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
-    
-    async def process_and_send_video(self, interaction: discord.Interaction):
-        try:
-            # Get original file size for logging
-            original_size_mb = os.path.getsize(self.video_path) / (1024 * 1024)
-
-            # Check if we need to queue
-            if processing_semaphore.locked() and len(processing_queue) == 0:
-                queue_position = await add_to_queue(self.user_id, interaction)
-            elif len(processing_queue) > 0:
-                queue_position = await add_to_queue(self.user_id, interaction)
-            
-            # Wait for our turn
-            async with processing_semaphore:
-                # Remove from queue when processing starts
-                await remove_from_queue(self.user_id)
-                
-                await interaction.followup.send(
-                    content=f"🔄 **Processing your video with enhanced quality...**\n"
-                        f"📦 Input: {original_size_mb:.1f}MB\n"
-                        f"🎯 Target: ~{TARGET_VIDEO_SIZE_MB}MB with improved bitrate\n"
-                        f"⏱️ This may take a few minutes for quality processing.",
-                    ephemeral=True
-                )
-
-                # Process the video with blur and enhanced quality
-                try:
-                    blurred_video_path = await asyncio.wait_for(
-                        blur_video(self.video_path),
-                        timeout=1800  # Increased to 30min for better quality processing
-                    )
-                except TimeoutError:
-                    await interaction.followup.send(
-                        content="❌ Video processing took too long and timed out.",
-                        ephemeral=True
-                    )
-                    cleanup_files([self.video_path])
-                    return
-
-                final_size_mb = os.path.getsize(blurred_video_path) / (1024 * 1024)
-
-                # Find the moderation channel
-                check_channel = None
-                if self.guild_id:
-                    guild = bot.get_guild(self.guild_id)
-                    if guild:
-                        check_channel_name,_,_ = get_channel_names(guild.id)
-                        check_channel = discord.utils.get(guild.channels, name=check_channel_name)
-
-                if not check_channel:
-                    await interaction.followup.send(
-                        content=f"❌ Moderation channel not found! Use /setup to configure channels.",
-                        ephemeral=True
-                    )
-                    cleanup_files([self.video_path, blurred_video_path])
-                    return
-
-                # Always use external hosting for reliability and visual display
-                video_url = await upload_to_catbox(blurred_video_path)
-
-                if not video_url:
-                    await interaction.followup.send(
-                        content="❌ Failed to upload video to external hosting. Please try again.",
-                        ephemeral=True
-                    )
-                    cleanup_files([self.video_path, blurred_video_path])
-                    return
-
-                # Create moderation message with visual embed
-                message_content = (
-                    f"🎮 **Clip Submission for Review**\n\n"
-                    f"Submitted by: {interaction.user.mention}\n"
-                    f"Claimed rank: **{self.selected_rank}**\n"
-                    f"File size: {original_size_mb:.1f}MB → {final_size_mb:.1f}MB\n\n"
-                    f"React with ✅ to approve or ❌ to reject this clip."
-                )
-
-                # Create embed that shows video preview directly in Discord
-                embed = discord.Embed(
-                    title="📹 Video Submission",
-                    description="Video preview below - click link for full quality",
-                    color=0x7AB0E7
-                )
-                embed.set_image(url=video_url)  # This shows the video preview in Discord
-                embed.add_field(name="🎬 Full Quality", value=f"[Open in browser]({video_url})", inline=False)
-                embed.add_field(name="👤 Submitter", value=interaction.user.mention, inline=True)
-                embed.add_field(name="🏆 Claimed Rank", value=f"**{self.selected_rank}**", inline=True)
-
-                moderation_message = await check_channel.send(message_content, embed=embed)
-                await moderation_message.add_reaction("✅")
-                await moderation_message.add_reaction("❌")
-
-                # Store moderation data
-                clip_data = {
-                    'rank': self.selected_rank,
-                    'user_id': interaction.user.id,
-                    'user_mention': interaction.user.mention,
-                    'video_url': video_url,
-                    'file_size_mb': final_size_mb,
-                    'guild_id': self.guild_id
-                }
-
-                if not hasattr(bot, 'pending_clips'):
-                    if os.path.exists(CLIP_DATA_FILE):
-                        with open(CLIP_DATA_FILE, 'r') as f:
-                            data = json.load(f)
-                            bot.pending_clips = {}
-                            # Convert string keys to int for guild IDs
-                            for guild_str, clips in data.items():
-                                try:
-                                    guild_id = int(guild_str)
-                                    bot.pending_clips[guild_id] = clips
-                                except ValueError:
-                                    # Handle old format where clips were at root level
-                                    if isinstance(clips, dict) and 'guild_id' in clips:
-                                        # This is a clip data, not a server container
-                                        clip_guild_id = clips.get('guild_id', self.guild_id)
-                                        if clip_guild_id not in bot.pending_clips:
-                                            bot.pending_clips[clip_guild_id] = {}
-                                        bot.pending_clips[clip_guild_id][guild_str] = clips
-                    else:
-                        bot.pending_clips = {}
-
-                # Ensure server structure exists
-                if self.guild_id not in bot.pending_clips:
-                    bot.pending_clips[self.guild_id] = {}
-
-                # Store under the message ID
-                bot.pending_clips[self.guild_id][str(moderation_message.id)] = clip_data
-
-                with open(CLIP_DATA_FILE, 'w') as f:
-                    json.dump(bot.pending_clips, f, indent=2)
-
-                await interaction.followup.send(
-                    content=f"✅ Video processed and uploaded successfully!\nFinal size: {final_size_mb:.1f}MB\nPreview will be visible in moderation channel.",
-                    ephemeral=True
-                )
-
-                cleanup_files([self.video_path, blurred_video_path])
-
-
-        except UnsupportedResolutionError as e:
-            # Handle unsupported resolution error specifically
-            await remove_from_queue(self.user_id)
-            print(f"❌ [RESOLUTION] User {interaction.user.name} submitted unsupported resolution: {e.width}x{e.height}")
-            await interaction.followup.send(
-                content=f"❌ **Video resolution not supported: {e.width}x{e.height}**\n\n"
-                    f"**Supported resolutions only:**\n"
-                    f"• 1920x1080 (1080p)\n"
-                    f"• 1280x720 (720p)\n\n"
-                    f"Please convert your video to one of these resolutions and submit again.",
-                ephemeral=True
-            )
-            cleanup_files([self.video_path])
-        except Exception as e:
-
-            # Make sure to remove from queue on error
-            await remove_from_queue(self.user_id)
-            await interaction.followup.send(
-                content="❌ Processing error. Please contact vaporr on Discord with a screenshot.",
-                ephemeral=True
-            )
-            print(f"Processing Error: {e}")
-            traceback.print_exc()
-            cleanup_files([self.video_path])
 
 
 class BlurSelector(discord.ui.View):
-    def __init__(self, user_id: int, video_path: str, guild_id: int, selected_rank: str):
+    def __init__(self, user_id: int, video_path: str, guild_id: int, selected_rank: str, content_key: str = None):
         super().__init__(timeout=300)
         self.user_id = user_id
         self.video_path = video_path
         self.guild_id = guild_id
         self.selected_rank = selected_rank
+        self.content_key = content_key
         
         # Blur option buttons
         self.blur_button = discord.ui.Button(
@@ -635,173 +574,18 @@ class BlurSelector(discord.ui.View):
         await self.process_and_send_video(interaction, apply_blur=False)
     
     async def process_and_send_video(self, interaction: discord.Interaction, apply_blur: bool = True):
+        """Hand the submission to the job queue, it survives restarts from here"""
         try:
-            # Get original file size for logging
-            original_size_mb = os.path.getsize(self.video_path) / (1024 * 1024)
-
-            # Check if we need to queue
-            if processing_semaphore.locked() and len(processing_queue) == 0:
-                queue_position = await add_to_queue(self.user_id, interaction)
-            elif len(processing_queue) > 0:
-                queue_position = await add_to_queue(self.user_id, interaction)
-            
-            # Wait for our turn
-            async with processing_semaphore:
-                # Remove from queue when processing starts
-                await remove_from_queue(self.user_id)
-                
-                blur_status = "with smart blur detection" if apply_blur else "without additional blur"
-                await interaction.followup.send(
-                    content=f"🔄 **Processing your video {blur_status}...**\n"
-                        f"📦 Input: {original_size_mb:.1f}MB\n"
-                        f"🎯 Target: ~{TARGET_VIDEO_SIZE_MB}MB with improved bitrate\n"
-                        f"⏱️ This may take a few minutes for quality processing.",
-                    ephemeral=True
-                )
-
-                # Process the video with or without blur
-                try:
-                    blurred_video_path = await asyncio.wait_for(
-                        blur_video(self.video_path, apply_blur=apply_blur),
-                        timeout=1800  # 30min timeout
-                    )
-                except TimeoutError:
-                    await interaction.followup.send(
-                        content="❌ Video processing took too long and timed out.",
-                        ephemeral=True
-                    )
-                    cleanup_files([self.video_path])
-                    return
-
-                final_size_mb = os.path.getsize(blurred_video_path) / (1024 * 1024)
-
-                # Find the moderation channel
-                check_channel = None
-                if self.guild_id:
-                    guild = bot.get_guild(self.guild_id)
-                    if guild:
-                        check_channel_name,_,_ = get_channel_names(guild.id)
-                        check_channel = discord.utils.get(guild.channels, name=check_channel_name)
-
-                if not check_channel:
-                    await interaction.followup.send(
-                        content=f"❌ Moderation channel not found! Use /setup to configure channels.",
-                        ephemeral=True
-                    )
-                    cleanup_files([self.video_path, blurred_video_path])
-                    return
-
-                # Always use external hosting for reliability and visual display
-                video_url = await upload_to_catbox(blurred_video_path)
-
-                if not video_url:
-                    await interaction.followup.send(
-                        content="❌ Failed to upload video to external hosting. Please try again.",
-                        ephemeral=True
-                    )
-                    cleanup_files([self.video_path, blurred_video_path])
-                    return
-
-                # Create moderation message with visual embed
-                blur_text = "🎨 Blur applied" if apply_blur else "✅ No additional blur"
-                message_content = (
-                    f"🎮 **Clip Submission for Review**\n\n"
-                    f"Submitted by: {interaction.user.mention}\n"
-                    f"Claimed rank: **{self.selected_rank}**\n"
-                    f"Processing: {blur_text}\n"
-                    f"File size: {original_size_mb:.1f}MB → {final_size_mb:.1f}MB\n\n"
-                    f"React with ✅ to approve or ❌ to reject this clip."
-                )
-
-                # Create embed that shows video preview directly in Discord
-                embed = discord.Embed(
-                    title="📹 Video Submission",
-                    description=f"Video preview below - click link for full quality\n{blur_text}",
-                    color=0x7AB0E7
-                )
-                embed.set_image(url=video_url)  # This shows the video preview in Discord
-                embed.add_field(name="🎬 Full Quality", value=f"[Open in browser]({video_url})", inline=False)
-                embed.add_field(name="👤 Submitter", value=interaction.user.mention, inline=True)
-                embed.add_field(name="🏆 Claimed Rank", value=f"**{self.selected_rank}**", inline=True)
-                embed.add_field(name="🎨 Processing", value=blur_text, inline=True)
-
-                moderation_message = await check_channel.send(message_content, embed=embed)
-                await moderation_message.add_reaction("✅")
-                await moderation_message.add_reaction("❌")
-
-                # Store moderation data
-                clip_data = {
-                    'rank': self.selected_rank,
-                    'user_id': interaction.user.id,
-                    'user_mention': interaction.user.mention,
-                    'video_url': video_url,
-                    'file_size_mb': final_size_mb,
-                    'guild_id': self.guild_id,
-                    'blur_applied': apply_blur
-                }
-
-                if not hasattr(bot, 'pending_clips'):
-                    if os.path.exists(CLIP_DATA_FILE):
-                        with open(CLIP_DATA_FILE, 'r') as f:
-                            data = json.load(f)
-                            bot.pending_clips = {}
-                            # Convert string keys to int for guild IDs
-                            for guild_str, clips in data.items():
-                                try:
-                                    guild_id = int(guild_str)
-                                    bot.pending_clips[guild_id] = clips
-                                except ValueError:
-                                    # Handle old format where clips were at root level
-                                    if isinstance(clips, dict) and 'guild_id' in clips:
-                                        # This is a clip data, not a server container
-                                        clip_guild_id = clips.get('guild_id', self.guild_id)
-                                        if clip_guild_id not in bot.pending_clips:
-                                            bot.pending_clips[clip_guild_id] = {}
-                                        bot.pending_clips[clip_guild_id][guild_str] = clips
-                    else:
-                        bot.pending_clips = {}
-
-                # Ensure server structure exists
-                if self.guild_id not in bot.pending_clips:
-                    bot.pending_clips[self.guild_id] = {}
-
-                # Store under the message ID
-                bot.pending_clips[self.guild_id][str(moderation_message.id)] = clip_data
-
-                with open(CLIP_DATA_FILE, 'w') as f:
-                    json.dump(bot.pending_clips, f, indent=2)
-
-                processing_text = "with blur applied" if apply_blur else "without additional blur"
-                await interaction.followup.send(
-                    content=f"✅ Video processed {processing_text} and uploaded successfully!\nFinal size: {final_size_mb:.1f}MB\nPreview will be visible in moderation channel.",
-                    ephemeral=True
-                )
-
-                cleanup_files([self.video_path, blurred_video_path])
-
-        except UnsupportedResolutionError as e:
-            # Handle unsupported resolution error specifically
-            await remove_from_queue(self.user_id)
-            print(f"❌ [RESOLUTION] User {interaction.user.name} submitted unsupported resolution: {e.width}x{e.height}")
-            await interaction.followup.send(
-                content=f"❌ **Video resolution not supported: {e.width}x{e.height}**\n\n"
-                    f"**Supported resolutions only:**\n"
-                    f"• 1920x1080 (1080p)\n"
-                    f"• 1280x720 (720p)\n\n"
-                    f"Please convert your video to one of these resolutions and submit again.",
-                ephemeral=True
-            )
-            cleanup_files([self.video_path])
+            await job_queue.submit(interaction, self.video_path, self.guild_id, self.selected_rank, apply_blur, self.content_key)
         except Exception as e:
-            # Make sure to remove from queue on error
-            await remove_from_queue(self.user_id)
             await interaction.followup.send(
                 content="❌ Processing error. Please contact vaporr on Discord with a screenshot.",
                 ephemeral=True
             )
             print(f"Processing Error: {e}")
             traceback.print_exc()
-            cleanup_files([self.video_path])          
+            cleanup_files([self.video_path])
+
 
 class GuessRankSelector(discord.ui.View):
     def __init__(self, clip_id: str, correct_rank: str):
@@ -880,8 +664,9 @@ class GuessRankSelector(discord.ui.View):
             clip_data['user_vote_count'][str(user_id)] = 1
             vote_text = f"voted **{selected_rank}**! (You can change your vote 1 more time)"
         
-        # Add new vote
+        # Add new vote, keep the voter's name so settlement doesn't have to fetch it
         clip_data['user_votes'][str(user_id)] = selected_rank
+        clip_data.setdefault('voter_names', {})[str(user_id)] = interaction.user.display_name
         
         # Update rank vote count
         if 'votes' not in clip_data:
@@ -894,9 +679,17 @@ class GuessRankSelector(discord.ui.View):
         if selected_rank == clip_data['correct_rank']:
             clip_data['correct_votes'] += 1
         
-        # Save updated server-specific data
-        results_data[guild_id][self.clip_id] = clip_data
-        save_results_data(results_data)
+        # Journal the vote instead of rewriting the results, the compactor folds it into a snapshot later
+        vote_journal.append({
+            'guild_id': guild_id,
+            'clip_id': self.clip_id,
+            'user_id': str(user_id),
+            'rank': selected_rank,
+            'username': interaction.user.display_name,
+            'changed': previous_vote is not None,
+            'previous': previous_vote,
+            'vote_count': clip_data['user_vote_count'][str(user_id)]
+        })
         
         # Send confirmation to user
         await interaction.response.send_message(
@@ -916,8 +709,7 @@ class GuessRankSelector(discord.ui.View):
                 if message_id:
                     guild = bot.get_guild(guild_id)
                     if guild:
-                        _, guess_channel_name, _ = get_channel_names(guild_id)
-                        guess_channel = discord.utils.get(guild.channels, name=guess_channel_name)
+                        guess_channel = channels.guess_channel(guild)
                         
                         if guess_channel:
                             try:
@@ -959,7 +751,7 @@ class GuessRankSelector(discord.ui.View):
             if guild_id in results_data and self.clip_id in results_data[guild_id]:
                 # Mark as expired
                 results_data[guild_id][self.clip_id]['expired'] = True
-                save_results_data(results_data)
+                save_results_data(results_data, guild_id, [self.clip_id])
         
         # Disable all items
         for item in self.children:
@@ -992,54 +784,44 @@ def calculate_score(guessed_rank: str, correct_rank: str, streak: int = 0) -> tu
         final_points = max(0, points)
         return final_points, False  # Wrong guess
 
-def load_user_scores() -> dict:
-    """Load user scores from file"""
-    scores_file = 'user_scores.json'
-    if os.path.exists(scores_file):
-        with open(scores_file, 'r') as f:
-            data = json.load(f)
-            # Convert string server IDs back to int
-            server_data = {}
-            for server_id, users in data.items():
-                server_data[int(server_id)] = users
-            return server_data
-    return {}
-
-def save_user_scores(scores_data: dict):
-    """Save user scores to file"""
-    scores_file = 'user_scores.json'
-    # Convert int server IDs to strings for JSON
-    server_data = {}
-    for server_id, users in scores_data.items():
-        server_data[str(server_id)] = users
-    
-    with open(scores_file, 'w') as f:
-        json.dump(server_data, f, indent=2)
-
-def update_user_score(user_id: int, guild_id: int, guessed_rank: str, correct_rank: str, username: str):
-    """Update user's score and streak"""
-    scores_data = load_user_scores()
-    
-    if guild_id not in scores_data:
-        scores_data[guild_id] = {}
-    
-    user_id_str = str(user_id)
-    if user_id_str not in scores_data[guild_id]:
-        scores_data[guild_id][user_id_str] = {
-            'username': username,
-            'total_score': 0,
-            'games_played': 0,
-            'correct_guesses': 0,
-            'current_streak': 0,
-            'best_streak': 0,
-            'history': []
-        }
+def rank_indices(ranks) -> np.ndarray:
+    """Turn rank names into an int8 array of RANK_ORDER indices, -1 for unknown ranks"""
+    ranks = list(ranks)
+    return np.fromiter((RANK_ORDER.get(rank, -1) for rank in ranks), dtype=np.int8, count=len(ranks))
+
+def calculate_scores_vectorized(guessed_idx: np.ndarray, correct_rank: str, streaks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """calculate_score for every voter of a clip at once, returns (points, is_correct) arrays"""
+    correct_idx = RANK_ORDER.get(correct_rank, -1)
+    guessed = guessed_idx.astype(np.int64)
+    valid = (guessed >= 0) & (correct_idx >= 0)
+    is_correct = valid & (guessed == correct_idx)
     
-    user_data = scores_data[guild_id][user_id_str]
-    current_streak = user_data['current_streak']
+    # Same float math as calculate_score so int() truncation matches exactly
+    exact_points = (POINTS_EXACT * (1.0 + (streaks * STREAK_MULTIPLIER_BASE))).astype(np.int64)
+    off_points = np.maximum(0, POINTS_EXACT + (np.abs(guessed - correct_idx) * POINTS_PER_RANK_OFF))
     
-    # Calculate points
-    points, is_correct = calculate_score(guessed_rank, correct_rank, current_streak)
+    points = np.where(is_correct, exact_points, np.where(valid, off_points, 0))
+    return points, is_correct
+
+def load_guild_scores(guild_id: int) -> dict:
+    """Load user scores of a single guild"""
+    return storage.load_guild(SCORES_DATA_FILE, guild_id)
+
+def new_user_score(username: str) -> dict:
+    return {
+        'username': username,
+        'total_score': 0,
+        'games_played': 0,
+        'correct_guesses': 0,
+        'current_streak': 0,
+        'best_streak': 0,
+        'history': []
+    }
+
+def record_guess_result(user_data: dict, guessed_rank: str, correct_rank: str, username: str,
+                        points: int, is_correct: bool, timestamp: str = None) -> tuple[int, int]:
+    """Write an already scored guess into a user's stats, returns (points, new streak)"""
+    current_streak = user_data['current_streak']
     
     # Update streak
     if is_correct:
@@ -1059,17 +841,167 @@ def update_user_score(user_id: int, guild_id: int, guessed_rank: str, correct_ra
         'correct': correct_rank,
         'points': points,
         'streak_at_time': current_streak,
-        'timestamp': datetime.now().isoformat()
+        'timestamp': timestamp or datetime.now().isoformat()
     })
     
     # Keep only last 50 games in history
     if len(user_data['history']) > 50:
         user_data['history'] = user_data['history'][-50:]
     
-    save_user_scores(scores_data)
-    print(f"🏆 [SCORE] {username}: {points} points, streak: {user_data['current_streak']}")
     return points, user_data['current_streak']
 
+def settle_clip_scores(guild_id: int, correct_rank: str, user_votes: dict, usernames: dict) -> dict:
+    """Score every voter of a clip with one load and one atomic save, returns {user_id: (points, streak)}"""
+    if not user_votes:
+        return {}
+    
+    records = storage.load_guild(SCORES_DATA_FILE, guild_id)
+    results = score_clip_votes(records, correct_rank, user_votes, usernames)
+    
+    # Only the voters changed, backends that can update rows in place write just those
+    storage.save_guild(SCORES_DATA_FILE, guild_id, records, keys=list(results))
+    for user_id_str in results:
+        leaderboard.update(guild_id, user_id_str, records[user_id_str])
+    print(f"🏆 [SCORE] Settled {len(results)} voter(s) in guild {guild_id}")
+    return results
+
+def score_clip_votes(records: dict, correct_rank: str, user_votes: dict, usernames: dict, timestamp: str = None) -> dict:
+    """Score a clip's votes into the given score records in place, points are computed in one NumPy pass"""
+    user_ids = list(user_votes.keys())
+    for user_id_str in user_ids:
+        if user_id_str not in records:
+            records[user_id_str] = new_user_score(usernames.get(user_id_str) or f"User-{user_id_str[-4:]}")
+    
+    guessed_idx = rank_indices(user_votes[user_id_str] for user_id_str in user_ids)
+    streaks = np.fromiter((records[user_id_str]['current_streak'] for user_id_str in user_ids), dtype=np.int64, count=len(user_ids))
+    points, is_correct = calculate_scores_vectorized(guessed_idx, correct_rank, streaks)
+    
+    results = {}
+    for i, user_id_str in enumerate(user_ids):
+        user_data = records[user_id_str]
+        username = usernames.get(user_id_str) or user_data['username']
+        results[user_id_str] = record_guess_result(
+            user_data, user_votes[user_id_str], correct_rank, username, int(points[i]), bool(is_correct[i]), timestamp
+        )
+    return results
+
+class LeaderboardIndex:
+    """Per-guild players kept sorted by (-total_score, user_id): O(page) pages and O(log n) ranks.
+    Rows also hold the last RECENT_GAMES of each player's history, so /profile never re-reads the shard."""
+    SUMMARY_FIELDS = ('username', 'total_score', 'games_played', 'correct_guesses', 'current_streak', 'best_streak')
+    RECENT_GAMES = 10
+
+    def __init__(self):
+        self._order = {}  # guild_id -> sorted list of (-total_score, user_id)
+        self._rows = {}   # guild_id -> {user_id: summary of the fields the scoreboard shows}
+
+    def _ensure(self, guild_id: int):
+        """Build a guild's index from storage the first time it is needed"""
+        if guild_id in self._order:
+            return
+        rows = {}
+        for user_id_str, user_data in storage.load_guild(SCORES_DATA_FILE, guild_id).items():
+            rows[user_id_str] = self._row(user_data)
+        self._rows[guild_id] = rows
+        self._order[guild_id] = sorted((-row['total_score'], user_id_str) for user_id_str, row in rows.items())
+
+    def _row(self, user_data: dict) -> dict:
+        row = {field: user_data[field] for field in self.SUMMARY_FIELDS}
+        row['recent_history'] = user_data.get('history', [])[-self.RECENT_GAMES:]
+        return row
+
+    def update(self, guild_id: int, user_id_str: str, user_data: dict):
+        """Re-position a player after their score settled"""
+        if guild_id not in self._order:
+            return  # Not built yet, it will read the fresh score when it is
+        order = self._order[guild_id]
+        rows = self._rows[guild_id]
+        old_row = rows.get(user_id_str)
+        if old_row is not None:
+            old_key = (-old_row['total_score'], user_id_str)
+            i = bisect.bisect_left(order, old_key)
+            if i < len(order) and order[i] == old_key:
+                del order[i]
+        row = self._row(user_data)
+        rows[user_id_str] = row
+        bisect.insort(order, (-row['total_score'], user_id_str))
+
+    def invalidate(self, guild_id: int):
+        self._order.pop(guild_id, None)
+        self._rows.pop(guild_id, None)
+
+    def page(self, guild_id: int, offset: int, limit: int) -> tuple[int, list]:
+        """Return (total players, summaries of the page best first)"""
+        self._ensure(guild_id)
+        order = self._order[guild_id]
+        rows = self._rows[guild_id]
+        return len(order), [rows[user_id_str] for _, user_id_str in order[offset:offset + limit]]
+
+    def profile(self, guild_id: int, user_id: int) -> Optional[dict]:
+        """Summary and recent history of a player, None if they never played"""
+        self._ensure(guild_id)
+        return self._rows[guild_id].get(str(user_id))
+
+    def rank(self, guild_id: int, user_id: int) -> tuple[Optional[int], int]:
+        """Return (1-based leaderboard position or None, total players)"""
+        self._ensure(guild_id)
+        order = self._order[guild_id]
+        row = self._rows[guild_id].get(str(user_id))
+        if row is None:
+            return None, len(order)
+        return bisect.bisect_left(order, (-row['total_score'], str(user_id))) + 1, len(order)
+
+
+leaderboard = LeaderboardIndex()
+
+def recompute_all_scores(force: bool = False) -> bool:
+    """Rebuild every guild's scores from the clip history, e.g. after retuning the point constants.
+    Games on clips removed by /cleanup can't be replayed, so guilds that played any keep their
+    stored scores unless force is set. Returns False if a guild was left alone."""
+    results_data = load_results_data()
+    old_data = storage.load_all(SCORES_DATA_FILE)
+    
+    # Keep a copy of every scoreboard before anything is overwritten
+    os.makedirs(DATA_DIR, exist_ok=True)
+    backup_path = os.path.join(DATA_DIR, f"user_scores.backup-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    atomic_write_text(backup_path, json.dumps({str(guild_id): users for guild_id, users in old_data.items()}, indent=2))
+    print(f"💾 [RECOMPUTE] Backed up the scores of {len(old_data)} guild(s) to {backup_path}")
+    
+    complete = True
+    # Guilds with scores but no clips left are checked too, everything they played is gone
+    for guild_id in sorted(set(results_data) | set(old_data)):
+        old_scores = old_data.get(guild_id, {})
+        finished = sorted(
+            (clip for clip in results_data.get(guild_id, {}).values() if clip.get('expired', False)),
+            key=lambda clip: clip['end_time']
+        )
+        
+        records = {}
+        for clip_data in finished:
+            user_votes = clip_data.get('user_votes', {})
+            if not user_votes:
+                continue
+            # Prefer the names players had on their profile, then the ones recorded with the votes
+            usernames = dict(clip_data.get('voter_names', {}))
+            usernames.update({uid: old_scores[uid]['username'] for uid in user_votes if uid in old_scores})
+            score_clip_votes(records, clip_data.get('correct_rank', 'Unknown'), user_votes, usernames, clip_data['end_time'])
+        
+        # Players who played more games than the stored clips hold would lose those points
+        short = [
+            uid for uid, user_data in old_scores.items()
+            if user_data.get('games_played', 0) > records.get(uid, {}).get('games_played', 0)
+        ]
+        if short and not force:
+            complete = False
+            print(f"⚠️ [RECOMPUTE] Guild {guild_id}: {len(short)} player(s) have games on clips that are no longer stored, "
+                  f"kept the stored scores (--force recomputes anyway)")
+            continue
+        
+        storage.save_guild(SCORES_DATA_FILE, guild_id, records)
+        leaderboard.invalidate(guild_id)
+        print(f"🏆 [RECOMPUTE] Guild {guild_id}: {len(finished)} finished clip(s), {len(records)} player(s)")
+    return complete
+
 def get_user_guess_from_clip(clip_id: str, guild_id: int, user_id: int) -> str:
     """Get a specific user's guess for a clip"""
     results_data = load_results_data()
@@ -1094,7 +1026,7 @@ async def get_results_embed_with_users(clip_id: str, guild_id: int, bot_instance
     clip_data = results_data[guild_id][clip_id]
     correct_rank = clip_data.get('correct_rank', 'Unknown')
     total_votes = clip_data.get('total_votes', 0)
-    video_url = clip_data.get('video_url', None)
+    video_url = await hosting.current_url(clip_data.get('hosting'), clip_data.get('video_url'))
     submitter_id = clip_data.get('submitter_id', None)
     user_votes = clip_data.get('user_votes', {})
     
@@ -1238,8 +1170,43 @@ async def get_results_embed_with_users(clip_id: str, guild_id: int, bot_instance
     return embed, main_content, video_url
 
 
-async def upload_to_catbox(file_path: str) -> str | None:
-    """Upload video to catbox.moe and return the URL with progress tracking"""
+class HttpClient:
+    """One pooled aiohttp session for every outbound request (downloads, uploads, mirrors).
+    Keeps connections alive and caches DNS so repeated submissions skip the handshakes."""
+
+    def __init__(self):
+        self._session = None
+
+    def open(self):
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_MAX_CONNECTIONS,
+            limit_per_host=HTTP_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": HTTP_USER_AGENT})
+        print(f"🌐 [HTTP] Session opened ({HTTP_MAX_CONNECTIONS} connections, {HTTP_LIMIT_PER_HOST} per host)")
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Lazily opened so offline tools can use it without setup_hook
+        if self._session is None or self._session.closed:
+            self.open()
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            print("🌐 [HTTP] Session closed")
+        self._session = None
+
+http = HttpClient()
+
+
+async def upload_to_catbox(file_path: str, api_url: str = CATBOX_API_URL, files_url: str = CATBOX_FILES_URL) -> str | None:
+    """Upload video to catbox.moe (or a server with the same API) and return the URL with progress tracking"""
     try:
         file_size = os.path.getsize(file_path) / (1024 * 1024)
         print(f"📤 [CATBOX] Starting upload: {file_size:.1f}MB")
@@ -1247,94 +1214,852 @@ async def upload_to_catbox(file_path: str) -> str | None:
         
         timeout = aiohttp.ClientTimeout(total=1200)  # 20 minutes for large files
         
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            with open(file_path, 'rb') as f:
-                data = aiohttp.FormData()
-                data.add_field('reqtype', 'fileupload')
-                data.add_field('fileToUpload', f, filename='video.mp4', content_type='video/mp4')
+        with open(file_path, 'rb') as f:
+            data = aiohttp.FormData()
+            data.add_field('reqtype', 'fileupload')
+            data.add_field('fileToUpload', f, filename='video.mp4', content_type='video/mp4')
+            
+            print(f"🌐 [CATBOX] Uploading to {api_url}...")
+            async with http.session.post(api_url, data=data, timeout=timeout) as response:
+                if response.status == 200:
+                    url = await response.text()
+                    if url.startswith(files_url):
+                        print(f"✅ [CATBOX] Upload successful: {url.strip()}")
+                        log_memory_usage("Upload completed")
+                        return url.strip()
                 
-                print(f"🌐 [CATBOX] Uploading to catbox.moe...")
-                async with session.post('https://catbox.moe/user/api.php', data=data) as response:
-                    if response.status == 200:
-                        url = await response.text()
-                        if url.startswith('https://files.catbox.moe/'):
-                            print(f"✅ [CATBOX] Upload successful: {url.strip()}")
-                            log_memory_usage("Upload completed")
-                            return url.strip()
-                    
-                    print(f"❌ [CATBOX] Upload failed with status: {response.status}")
-                    return None
+                print(f"❌ [CATBOX] Upload failed with status: {response.status}")
+                return None
                     
     except Exception as e:
         print(f"❌ [CATBOX] Upload error: {e}")
         return None
 
-async def add_to_queue(user_id: int, interaction: discord.Interaction) -> int:
-    """Add user to processing queue and return their position"""
-    position = len(processing_queue) + 1
-    
-    # Send initial queue message
-    queue_embed = discord.Embed(
-        title="⏳ Added to Processing Queue",
-        description=f"You are **#{position}** in the queue.\nProcessing up to {MAX_CONCURRENT_PROCESSING} videos simultaneously.",
+class HostingBackend(ABC):
+    """Somewhere to put an encoded clip so Discord can show it, upload() returns None to try the next backend"""
+    name = None
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def upload(self, file_path: str, guild_id: int) -> Optional[dict]:
+        """Host a file, returns {'backend': name, 'url': url, ...} with whatever current_url needs later"""
+
+    async def current_url(self, hosted: dict) -> Optional[str]:
+        return hosted.get('url')
+
+    async def discard(self, hosted: dict):
+        """Free a hosted clip that will never be shown (rejected), where the backend allows it"""
+        pass
+
+class CatboxHosting(HostingBackend):
+    name = 'catbox'
+
+    def __init__(self, api_url: str = CATBOX_API_URL, files_url: str = CATBOX_FILES_URL):
+        self.api_url = api_url
+        self.files_url = files_url
+
+    async def upload(self, file_path: str, guild_id: int) -> Optional[dict]:
+        url = await upload_to_catbox(file_path, self.api_url, self.files_url)
+        return {'backend': self.name, 'url': url} if url else None
+
+class DiscordHosting(HostingBackend):
+    """Posts the clip as an attachment in the HOSTING_DISCORD_CHANNEL_ID storage channel. Attachment links expire
+    after about a day, so the message is kept and current_url fetches a fresh link from it."""
+    name = 'discord'
+
+    async def upload(self, file_path: str, guild_id: int) -> Optional[dict]:
+        if not HOSTING_DISCORD_CHANNEL_ID:
+            return None
+        channel = bot.get_channel(HOSTING_DISCORD_CHANNEL_ID)
+        if not channel:
+            print(f"❌ [DISCORD HOST] Storage channel {HOSTING_DISCORD_CHANNEL_ID} not found")
+            return None
+        size = os.path.getsize(file_path)
+        if size > channel.guild.filesize_limit:
+            print(f"❌ [DISCORD HOST] {size / (1024 * 1024):.1f}MB is over the {channel.guild.filesize_limit / (1024 * 1024):.0f}MB limit of {channel.guild.name}")
+            return None
+        try:
+            # discord.File streams from the path, the clip is never read into memory
+            message = await channel.send(content="📦 Hosted clip, don't delete while it is pending or being voted on",
+                                         file=discord.File(file_path, filename='video.mp4'))
+        except discord.HTTPException as e:
+            print(f"❌ [DISCORD HOST] Upload error: {e}")
+            return None
+        return {'backend': self.name, 'url': message.attachments[0].url, 'channel_id': channel.id, 'message_id': message.id}
+
+    async def current_url(self, hosted: dict) -> Optional[str]:
+        try:
+            channel = bot.get_channel(hosted['channel_id']) or await bot.fetch_channel(hosted['channel_id'])
+            message = await channel.fetch_message(hosted['message_id'])
+            return message.attachments[0].url
+        except (discord.HTTPException, IndexError, KeyError) as e:
+            print(f"❌ [DISCORD HOST] Could not refresh link: {e}")
+            return hosted.get('url')
+
+    async def discard(self, hosted: dict):
+        try:
+            channel = bot.get_channel(hosted['channel_id']) or await bot.fetch_channel(hosted['channel_id'])
+            message = await channel.fetch_message(hosted['message_id'])
+            await message.delete()
+        except (discord.HTTPException, KeyError) as e:
+            print(f"❌ [DISCORD HOST] Could not delete hosted clip: {e}")
+
+class LocalHosting(CatboxHosting):
+    """Static file server on this host with a catbox compatible upload endpoint.
+    Works offline, for upload benchmarks and tests, or as a fallback when LOCAL_HOSTING_URL is reachable from outside.
+    Only loopback clients (the bot itself) may upload, files are deleted after LOCAL_HOSTING_MAX_AGE_HOURS."""
+    name = 'local'
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self, directory: str, host: str, port: int, public_url: str):
+        # Uploads always go through loopback, even when the server listens on every interface
+        super().__init__(api_url=f"http://127.0.0.1:{port}/user/api.php", files_url=f"{public_url.rstrip('/')}/files/")
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self._runner = None
+        self._prune_task = None
+
+    async def start(self):
+        if self._runner:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app = web.Application(client_max_size=200 * 1024 * 1024) # Same cap as submissions
+        app.router.add_post('/user/api.php', self._handle_upload)
+        app.router.add_static('/files/', self.directory)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._prune_task = asyncio.create_task(self._prune_loop())
+        print(f"🌐 [LOCAL HOST] Serving {self.directory}/ on {self.host}:{self.port}")
+
+    async def close(self):
+        if self._prune_task:
+            self._prune_task.cancel()
+            self._prune_task = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def prune(self, max_age_hours: int = LOCAL_HOSTING_MAX_AGE_HOURS) -> int:
+        """Delete hosted files older than max_age_hours, returns how many were removed"""
+        cutoff = time.time() - max_age_hours * 3600
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError as e:
+                print(f"❌ [LOCAL HOST] Could not prune {entry.name}: {e}")
+        if removed:
+            print(f"🧹 [LOCAL HOST] Pruned {removed} file(s) older than {max_age_hours}h")
+        return removed
+
+    async def _prune_loop(self):
+        while True:
+            await asyncio.to_thread(self.prune)
+            await asyncio.sleep(self.PRUNE_INTERVAL)
+
+    @staticmethod
+    def _is_loopback(remote: Optional[str]) -> bool:
+        try:
+            return remote is not None and ipaddress.ip_address(remote).is_loopback
+        except ValueError:
+            return False
+
+    async def _handle_upload(self, request: web.Request) -> web.Response:
+        if not self._is_loopback(request.remote):
+            return web.Response(status=403, text="Uploads are only accepted from this host")
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name != 'fileToUpload':
+                continue
+            name = f"{int(time.time() * 1000)}_{random.randrange(16 ** 6):06x}.mp4"
+            path = os.path.join(self.directory, name)
+            # Written chunk by chunk, the server never holds a whole clip in memory
+            with open(path, 'wb') as f:
+                while chunk := await part.read_chunk(STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+            return web.Response(text=self.files_url + name)
+        return web.Response(status=400, text="fileToUpload missing")
+
+class HostingManager:
+    """Hosting backends in HOSTING_BACKENDS order, the next one is tried when a backend fails"""
+    AVAILABLE = {
+        'catbox': lambda: CatboxHosting(),
+        'discord': lambda: DiscordHosting(),
+        'local': lambda: LocalHosting(LOCAL_HOSTING_DIR, LOCAL_HOSTING_HOST, LOCAL_HOSTING_PORT, LOCAL_HOSTING_URL)
+    }
+
+    def __init__(self, names: List[str]):
+        unknown = [name for name in names if name not in self.AVAILABLE]
+        if unknown:
+            print(f"❌ [HOSTING] Unknown backend(s) ignored: {', '.join(unknown)}")
+        if 'discord' in names and not HOSTING_DISCORD_CHANNEL_ID:
+            print("❌ [HOSTING] The discord backend needs HOSTING_DISCORD_CHANNEL_ID, it will be skipped")
+        self.backends = [self.AVAILABLE[name]() for name in names if name in self.AVAILABLE] or [CatboxHosting()]
+
+    async def start(self):
+        for backend in self.backends:
+            await backend.start()
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.close()
+
+    async def upload(self, file_path: str, guild_id: int) -> Optional[dict]:
+        for backend in self.backends:
+            hosted = await backend.upload(file_path, guild_id)
+            if hosted:
+                return hosted
+            print(f"⚠️ [HOSTING] {backend.name} failed, trying the next backend")
+        return None
+
+    async def current_url(self, hosted: Optional[dict], fallback: str = None) -> Optional[str]:
+        """Link to show for a hosted clip, refreshed for backends whose links expire"""
+        if not hosted:
+            return fallback
+        backend = next((backend for backend in self.backends if backend.name == hosted.get('backend')), None)
+        if backend is None and hosted.get('backend') in self.AVAILABLE:
+            # Backend removed from HOSTING_BACKENDS since the clip was hosted
+            backend = self.AVAILABLE[hosted['backend']]()
+        return await backend.current_url(hosted) if backend else hosted.get('url', fallback)
+
+    async def discard(self, hosted: Optional[dict]):
+        if hosted and hosted.get('backend') in self.AVAILABLE:
+            await self.AVAILABLE[hosted['backend']]().discard(hosted)
+
+hosting = HostingManager(HOSTING_BACKENDS)
+
+class UploadManager:
+    """Retries failed uploads with bounded exponential backoff and keeps throughput counters.
+    Catbox has no resumable upload API, so every attempt sends the file again from disk."""
+
+    def __init__(self, workers: int, max_attempts: int):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.active = 0
+        self.waiting = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.by_backend = {}
+        self.recent_rates = deque(maxlen=20) # MB/s of the last successful uploads
+        self._semaphore = asyncio.Semaphore(workers)
+
+    def backoff(self, attempt: int) -> float:
+        """Delay after the given failed attempt, jittered so retries of several clips don't line up"""
+        return min(UPLOAD_BACKOFF_MAX, UPLOAD_BACKOFF_BASE * 2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+
+    def average_rate(self) -> Optional[float]:
+        return sum(self.recent_rates) / len(self.recent_rates) if self.recent_rates else None
+
+    async def _attempt(self, file_path: str, guild_id: int) -> Optional[dict]:
+        self.waiting += 1
+        async with self._semaphore:
+            self.waiting -= 1
+            self.active += 1
+            try:
+                return await hosting.upload(file_path, guild_id)
+            finally:
+                self.active -= 1
+
+    async def upload(self, file_path: str, guild_id: int = None, on_retry=None) -> Optional[dict]:
+        """Host a file through the backends, returns the hosted record or None once every attempt failed.
+        on_retry(attempt, delay) is awaited before each backoff."""
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.monotonic()
+            hosted = await self._attempt(file_path, guild_id)
+            elapsed = max(time.monotonic() - started, 0.001)
+            if hosted:
+                self.succeeded += 1
+                self.bytes_sent += int(size_mb * 1024 * 1024)
+                self.by_backend[hosted['backend']] = self.by_backend.get(hosted['backend'], 0) + 1
+                self.recent_rates.append(size_mb / elapsed)
+                print(f"📤 [UPLOAD] {size_mb:.1f}MB to {hosted['backend']} in {elapsed:.1f}s ({size_mb / elapsed:.2f}MB/s), attempt {attempt}/{self.max_attempts}")
+                return hosted
+            if attempt == self.max_attempts:
+                break
+            delay = self.backoff(attempt)
+            self.retries += 1
+            print(f"🔁 [UPLOAD] Attempt {attempt}/{self.max_attempts} failed, retrying in {delay:.0f}s")
+            if on_retry:
+                await on_retry(attempt, delay)
+            await asyncio.sleep(delay)
+
+        self.failed += 1
+        print(f"❌ [UPLOAD] Giving up on {file_path} after {self.max_attempts} attempts")
+        return None
+
+upload_manager = UploadManager(UPLOAD_WORKERS, UPLOAD_MAX_ATTEMPTS)
+
+class TranscodePool:
+    """Bounded ffmpeg concurrency sized from the host, jobs only start while there is free RAM"""
+    MEMORY_POLL = 5 # Seconds between headroom checks while waiting for memory
+
+    def __init__(self):
+        cpu_count = psutil.cpu_count() or 1
+        total_mb = psutil.virtual_memory().total / (1024 * 1024)
+        self.workers = TRANSCODE_WORKERS or max(1, min(cpu_count // TRANSCODE_MIN_THREADS_PER_JOB, int(total_mb // TRANSCODE_JOB_MEMORY_MB)))
+        # When RAM caps the workers, the spare cores go to the running jobs
+        self.threads = min(TRANSCODE_THREADS_PER_JOB, cpu_count) if TRANSCODE_THREADS_PER_JOB else max(1, cpu_count // self.workers)
+        self.active = 0
+        self._cond = asyncio.Condition()
+
+    def busy(self) -> bool:
+        return self.active >= self.workers
+
+    def has_headroom(self) -> bool:
+        """Always admit the first job, others need TRANSCODE_JOB_MEMORY_MB available"""
+        if self.active == 0:
+            return True
+        return psutil.virtual_memory().available / (1024 * 1024) >= TRANSCODE_JOB_MEMORY_MB
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Wait for a free worker with enough memory, yields the ffmpeg thread count to use"""
+        async with self._cond:
+            while self.busy() or not self.has_headroom():
+                try:
+                    # Memory frees up without a notify, so re-check periodically
+                    await asyncio.wait_for(self._cond.wait(), timeout=self.MEMORY_POLL)
+                except asyncio.TimeoutError:
+                    pass
+            self.active += 1
+        print(f"⚙️ [TRANSCODE] Job started ({self.active}/{self.workers} workers busy)")
+        try:
+            yield self.threads
+        finally:
+            async with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def try_reserve(self, count: int) -> int:
+        """Take up to count extra slots without waiting, returns how many were granted (0 when busy)"""
+        available_mb = psutil.virtual_memory().available / (1024 * 1024)
+        granted = min(count, self.workers - self.active, int(available_mb // TRANSCODE_JOB_MEMORY_MB))
+        granted = max(granted, 0)
+        self.active += granted
+        return granted
+
+    async def release(self, count: int):
+        if not count:
+            return
+        async with self._cond:
+            self.active -= count
+            self._cond.notify_all()
+
+transcode_pool = TranscodePool()
+
+class SubmissionQueue:
+    """Durable pipeline of submissions, one JSON record per job in JOBS_DIR.
+    Every job goes through validate -> encode -> upload -> post, each stage has its own workers and queue,
+    so a clip uploads while the next one encodes."""
+    STAGES = ('validate', 'encode', 'upload', 'post')
+    PARKED = 'parked' # Returned by a stage handler that keeps the job (and its files) for a later retry
+    MAX_ATTEMPTS = 3 # Drop a job that keeps getting interrupted instead of crashing the bot on every start
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.jobs = {}
+        self.interactions = {}
+        self.status_messages = {}
+        self.recent_waits = deque(maxlen=20)
+        self.recent_durations = deque(maxlen=20)
+        # Bounded upload queue, encoders wait instead of piling encoded clips on disk when the host is slow
+        self._queues = {stage: asyncio.Queue(maxsize=UPLOAD_BACKLOG if stage == 'upload' else 0) for stage in self.STAGES}
+        self._workers = []
+        self._parked = set()
+        self._resumed = []
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _save(self, job: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write_text(self._job_path(job['job_id']), json.dumps(job, indent=2))
+
+    def _remove(self, job: dict):
+        job_id = job['job_id']
+        self.jobs.pop(job_id, None)
+        self.interactions.pop(job_id, None)
+        self.status_messages.pop(job_id, None)
+        try:
+            os.remove(self._job_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def load(self):
+        """Queue again the jobs left by the previous run, oldest first"""
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.listdir(self.directory):
+            if not entry.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, entry), 'r') as f:
+                    job = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"❌ [JOBS] Skipping unreadable job {entry}: {e}")
+                continue
+            if 'stage' not in job:
+                # Written before the staged pipeline
+                job['stage'] = 'upload' if job['status'] == 'uploading' else 'validate'
+            if job['stage'] in ('upload', 'post'):
+                # Already encoded, only the upload and the moderation post are left
+                if not os.path.exists(job.get('output_path', '')):
+                    print(f"❌ [JOBS] Encoded output of job {job['job_id']} is gone, dropping it")
+                    self._remove(job)
+                    continue
+                if job['status'] != self.PARKED:
+                    job['status'] = 'queued'
+                self.jobs[job['job_id']] = job
+                continue
+            if not os.path.exists(job['input_path']):
+                print(f"❌ [JOBS] Input of job {job['job_id']} is gone, dropping it")
+                self._remove(job)
+                continue
+            if job.get('attempts', 0) >= self.MAX_ATTEMPTS:
+                print(f"❌ [JOBS] Job {job['job_id']} failed {job['attempts']} times, dropping it")
+                cleanup_files([job['input_path']])
+                self._remove(job)
+                continue
+            job['status'] = 'queued'
+            self.jobs[job['job_id']] = job
+
+        self._resumed = sorted(self.jobs.values(), key=lambda job: job['created_at'])
+        if self._resumed:
+            print(f"📋 [JOBS] Resumed {len(self._resumed)} queued submission(s)")
+
+    def start(self):
+        """Start the workers of every stage and tell resumed submitters they are still queued"""
+        if self._workers:
+            return
+        handlers = {
+            'validate': (self._validate, PIPELINE_VALIDATE_WORKERS),
+            'encode': (self._encode, transcode_pool.workers),
+            'upload': (self._upload, upload_manager.workers),
+            'post': (self._post, PIPELINE_POST_WORKERS)
+        }
+        for stage in self.STAGES:
+            handler, workers = handlers[stage]
+            for _ in range(workers):
+                self._workers.append(asyncio.create_task(self._stage_worker(stage, handler)))
+
+        for job in self._resumed:
+            if job['status'] == self.PARKED:
+                self._schedule_retry(job)
+                continue
+            asyncio.create_task(self._queues[job['stage']].put(job['job_id']))
+            if job['stage'] in ('upload', 'post'):
+                asyncio.create_task(self.notify(job, content="🔁 Bot restarted, uploading your processed video again."))
+            else:
+                asyncio.create_task(self.notify(job, embed=self._queue_embed(job, "🔁 Submission Resumed After Restart")))
+        self._resumed = []
+
+    def queued(self) -> list:
+        """Jobs still waiting for the encoder, oldest first"""
+        waiting = (job for job in self.jobs.values()
+                   if job['stage'] == 'validate' or (job['stage'] == 'encode' and job['status'] == 'queued'))
+        return sorted(waiting, key=lambda job: job['created_at'])
+
+    def depth(self) -> int:
+        return len(self.queued())
+
+    def running(self) -> int:
+        return self.stage_counts()['encode'][1]
+
+    def stage_counts(self) -> dict:
+        """(queued, running) job counts of every stage"""
+        counts = {stage: [0, 0] for stage in self.STAGES}
+        for job in self.jobs.values():
+            counts[job['stage']][job['status'] == 'running'] += 1
+        return {stage: tuple(count) for stage, count in counts.items()}
+
+    def position(self, job: dict) -> int:
+        queued_ids = [queued['job_id'] for queued in self.queued()]
+        return queued_ids.index(job['job_id']) + 1 if job['job_id'] in queued_ids else 0
+
+    def average_wait(self) -> Optional[float]:
+        return sum(self.recent_waits) / len(self.recent_waits) if self.recent_waits else None
+
+    def oldest_wait(self) -> float:
+        queued = self.queued()
+        return time.time() - queued[0]['created_at'] if queued else 0
+
+    def estimated_wait(self, position: int) -> Optional[float]:
+        """Seconds before the job at this position starts, from recent job durations"""
+        if not self.recent_durations:
+            return None
+        average_duration = sum(self.recent_durations) / len(self.recent_durations)
+        return average_duration * ((position - 1) // transcode_pool.workers + 1)
+
+    def _queue_embed(self, job: dict, title: str) -> discord.Embed:
+        position = self.position(job)
+        description = f"You are **#{position}** in the queue.\nProcessing up to {transcode_pool.workers} videos simultaneously."
+        eta = self.estimated_wait(position)
+        if eta:
+            description += f"\nEstimated wait: ~{max(1, round(eta / 60))} min"
+        return discord.Embed(title=title, description=description, color=0x7AB0E7)
+
+    async def submit(self, interaction: discord.Interaction, video_path: str, guild_id: int, rank: str, apply_blur: bool, content_key: str = None) -> dict:
+        """Persist a submission and queue it, the video is moved out of the temp dir so a reboot keeps it"""
+        job_id = f"{int(time.time() * 1000)}_{interaction.user.id}"
+        os.makedirs(SUBMISSIONS_DIR, exist_ok=True)
+        input_path = os.path.join(SUBMISSIONS_DIR, job_id + os.path.splitext(video_path)[1])
+        await asyncio.to_thread(shutil.move, video_path, input_path)
+
+        job = {
+            'job_id': job_id,
+            'user_id': interaction.user.id,
+            'user_mention': interaction.user.mention,
+            'guild_id': guild_id,
+            'rank': rank,
+            'apply_blur': apply_blur,
+            'input_path': input_path,
+            'content_key': content_key, # Hash of the input from validate_video, the cache key of its probe and encodes
+            'stage': 'validate',
+            'status': 'queued',
+            'attempts': 0,
+            'created_at': time.time()
+        }
+        self._save(job)
+        self.jobs[job_id] = job
+        self.interactions[job_id] = interaction
+
+        if transcode_pool.busy() or self.depth() > 1:
+            message = await self.notify(job, embed=self._queue_embed(job, "⏳ Added to Processing Queue"))
+            if message:
+                self.status_messages[job_id] = message
+
+        self._queues['validate'].put_nowait(job_id)
+        print(f"📋 [JOBS] Queued job {job_id} (depth {self.depth()})")
+        return job
+
+    async def notify(self, job: dict, content: str = None, embed: discord.Embed = None):
+        """Message the submitter, through the interaction while its token is alive, by DM otherwise"""
+        interaction = self.interactions.get(job['job_id'])
+        if interaction and not interaction.is_expired():
+            try:
+                return await interaction.followup.send(content=content, embed=embed, ephemeral=True)
+            except discord.HTTPException:
+                pass
+        return await self._direct_message(job, content, embed)
+
+    async def _direct_message(self, job: dict, content: str = None, embed: discord.Embed = None):
+        try:
+            user = bot.get_user(job['user_id']) or await bot.fetch_user(job['user_id'])
+            return await user.send(content=content, embed=embed)
+        except discord.HTTPException as e:
+            print(f"❌ [JOBS] Could not notify user {job['user_id']}: {e}")
+            return None
+
+    async def edit_status(self, job: dict, message, content: str = None, embed: discord.Embed = None):
+        """Edit a status message from notify(). Followups die with the interaction token after 15 minutes,
+        then the update is sent by DM once and that DM is edited from then on. Returns the message to edit next."""
+        if not message:
+            return None
+        interaction = self.interactions.get(job['job_id'])
+        token_alive = interaction is not None and not interaction.is_expired()
+        if token_alive or not isinstance(message, discord.WebhookMessage):
+            try:
+                await message.edit(content=content, embed=embed)
+                return message
+            except discord.HTTPException:
+                pass  # Token expired early or the message was deleted
+        return await self._direct_message(job, content, embed)
+
+    async def _refresh_positions(self):
+        """Update the queue message of everyone still waiting"""
+        for job in self.queued():
+            message = self.status_messages.get(job['job_id'])
+            if not message:
+                continue
+            message = await self.edit_status(job, message, embed=self._queue_embed(job, "⏳ Queue Position Updated"))
+            if message:
+                self.status_messages[job['job_id']] = message
+            else:
+                self.status_messages.pop(job['job_id'], None)
+
+    async def _stage_worker(self, stage: str, handler):
+        queue = self._queues[stage]
+        while True:
+            job_id = await queue.get()
+            job = self.jobs.get(job_id)
+            if not job:
+                continue
+
+            job['status'] = 'running'
+            next_stage = None
+            try:
+                next_stage = await handler(job)
+            except Exception as e:
+                await self.notify(job, content="❌ Processing error. Please contact vaporr on Discord with a screenshot.")
+                print(f"Processing Error ({stage}): {e}")
+                traceback.print_exc()
+
+            # Not reached when the bot is shutting down, the job then resumes from this stage on next start
+            if next_stage == self.PARKED:
+                continue
+            if next_stage:
+                job['stage'] = next_stage
+                job['status'] = 'queued'
+                self._save(job)
+                await self._queues[next_stage].put(job_id)
+            else:
+                cleanup_files([path for path in (job['input_path'], job.get('output_path')) if path])
+                self._remove(job)
+
+    async def _validate(self, job: dict) -> Optional[str]:
+        """Cheap checks before the job takes an encoder, the file itself was validated at download"""
+        guild = bot.get_guild(job['guild_id']) if job['guild_id'] else None
+        if not guild or not channels.check_channel(guild):
+            await self.notify(job, content=f"❌ Moderation channel not found! Use /setup to configure channels.")
+            return None
+        if not job.get('content_key') or not media_cache.get_probe(job['content_key']):
+            # Probe evicted or job from an older version, check the file again
+            try:
+                job['content_key'] = await validate_video(job['input_path'])
+            except (InvalidVideoError, UnsupportedResolutionError) as e:
+                await self.notify(job, content=f"❌ {e}")
+                return None
+        return 'encode'
+
+    async def _encode(self, job: dict) -> Optional[str]:
+        async with transcode_pool.slot() as threads:
+            job['started_at'] = time.time()
+            job['attempts'] = job.get('attempts', 0) + 1
+            self._save(job)
+            self.recent_waits.append(job['started_at'] - job['created_at'])
+            await self._refresh_positions()
+
+            encoded = await encode_submission(job, threads)
+            self.recent_durations.append(time.time() - job['started_at'])
+        # The slot is free again here, the next encode starts while this clip uploads
+        if not encoded:
+            return None
+        cleanup_files([job['input_path']])
+        return 'upload'
+
+    async def _upload(self, job: dict) -> Optional[str]:
+        if await upload_submission(job):
+            job.pop('parked_since', None)
+            return 'post'
+
+        # Keep the encoded clip and try again later instead of making the user resubmit
+        first_park = 'parked_since' not in job
+        job.setdefault('parked_since', time.time())
+        if time.time() - job['parked_since'] > UPLOAD_PARK_MAX_HOURS * 3600:
+            await self.notify(job, content=f"❌ Failed to upload video to external hosting for {UPLOAD_PARK_MAX_HOURS} hours, giving up. Please submit it again.")
+            return None
+        if first_park:
+            await self.notify(job, content=f"⚠️ Failed to upload video to external hosting after {upload_manager.max_attempts} attempts. "
+                                           f"Your processed video is kept and the upload is tried again every {UPLOAD_PARK_MINUTES} minutes.")
+        job['status'] = self.PARKED
+        job['retry_at'] = time.time() + UPLOAD_PARK_MINUTES * 60
+        self._save(job)
+        self._schedule_retry(job)
+        return self.PARKED
+
+    def _schedule_retry(self, job: dict):
+        task = asyncio.create_task(self._retry_parked(job))
+        self._parked.add(task)
+        task.add_done_callback(self._parked.discard)
+
+    async def _retry_parked(self, job: dict):
+        await asyncio.sleep(max(0, job.get('retry_at', 0) - time.time()))
+        job['status'] = 'queued'
+        self._save(job)
+        print(f"🔁 [JOBS] Retrying the upload of parked job {job['job_id']}")
+        await self._queues[job['stage']].put(job['job_id'])
+
+    async def _post(self, job: dict) -> Optional[str]:
+        await post_submission(job)
+        return None
+
+    async def close(self):
+        """Stop the workers, interrupted jobs go back to their stage without counting as an attempt"""
+        tasks = self._workers + list(self._parked)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        for job in self.jobs.values():
+            if job['status'] == 'running':
+                job['status'] = 'queued'
+                if job['stage'] == 'encode':
+                    job['attempts'] = max(0, job.get('attempts', 1) - 1)
+                self._save(job)
+
+job_queue = SubmissionQueue(JOBS_DIR)
+
+async def encode_submission(job: dict, threads: int) -> bool:
+    """Encode a queued submission into SUBMISSIONS_DIR, returns True when it is ready to upload"""
+    input_path = job['input_path']
+    apply_blur = job['apply_blur']
+
+    # Get original file size for logging
+    original_size_mb = os.path.getsize(input_path) / (1024 * 1024)
+
+    blur_status = "with smart blur detection" if apply_blur else "without additional blur"
+    status_header = (f"🔄 **Processing your video {blur_status}...**\n"
+            f"📦 Input: {original_size_mb:.1f}MB\n"
+            f"🎯 Target: ~{TARGET_VIDEO_SIZE_MB}MB with improved bitrate\n")
+    status_message = await job_queue.notify(job, content=status_header + f"⏱️ This may take a few minutes for quality processing.")
+
+    async def report_progress(percent: float, fps: float, eta: Optional[float]):
+        # Edits are throttled by run_ffmpeg, so this stays far below Discord's rate limits
+        nonlocal status_message
+        eta_text = format_eta(eta) if eta is not None else "estimating..."
+        status_message = await job_queue.edit_status(job, status_message,
+                                                     content=status_header + f"⏱️ **{percent:.0f}%** done, {fps:.0f} fps, ETA {eta_text}")
+
+    # Process the video with or without blur
+    try:
+        blurred_video_path = await asyncio.wait_for(
+            blur_video(input_path, apply_blur=apply_blur, threads=threads, on_progress=report_progress, content_key=job.get('content_key')),
+            timeout=1800  # 30min timeout
+        )
+    except TimeoutError:
+        await job_queue.notify(job, content="❌ Video processing took too long and timed out.")
+        return False
+    except UnsupportedResolutionError as e:
+        # Handle unsupported resolution error specifically
+        print(f"❌ [RESOLUTION] User {job['user_id']} submitted unsupported resolution: {e.width}x{e.height}")
+        await job_queue.notify(job, content=f"❌ **Video resolution not supported: {e.width}x{e.height}**\n\n"
+                f"**Supported resolutions:**\n"
+                f"• Landscape clips of at least 1280x720 (720p)\n"
+                f"• 4:3 up to 32:9 ultrawide, above 1080p is downscaled automatically\n\n"
+                f"Please convert your video and submit again.")
+        return False
+
+    # Keep the encoded clip next to the submission until it is uploaded, a restart then skips the encode
+    output_path = os.path.join(SUBMISSIONS_DIR, f"{job['job_id']}_encoded.mp4")
+    await asyncio.to_thread(shutil.move, blurred_video_path, output_path)
+    job['output_path'] = output_path
+    job['input_size_mb'] = original_size_mb
+    return True
+
+async def upload_submission(job: dict) -> bool:
+    """Upload an encoded submission, its URL is saved with the job so a restart doesn't upload it twice"""
+    async def report_retry(attempt: int, delay: float):
+        if attempt == 1:
+            await job_queue.notify(job, content=f"⚠️ Upload failed, retrying automatically (next try in {delay:.0f}s)...")
+
+    # Always use external hosting for reliability and visual display
+    hosted = await upload_manager.upload(job['output_path'], job['guild_id'], on_retry=report_retry)
+
+    if not hosted:
+        return False
+    job['video_url'] = hosted['url']
+    job['hosting'] = hosted
+    return True
+
+async def post_submission(job: dict):
+    """Post an uploaded submission to the moderation channel"""
+    video_url = job['video_url']
+    apply_blur = job['apply_blur']
+    guild_id = job['guild_id']
+    selected_rank = job['rank']
+    user_mention = job['user_mention']
+    original_size_mb = job['input_size_mb']
+
+    final_size_mb = os.path.getsize(job['output_path']) / (1024 * 1024)
+
+    # Find the moderation channel
+    check_channel = None
+    guild = bot.get_guild(guild_id) if guild_id else None
+    if guild:
+        check_channel = channels.check_channel(guild)
+
+    if not check_channel:
+        await job_queue.notify(job, content=f"❌ Moderation channel not found! Use /setup to configure channels.")
+        return
+
+    # Create moderation message with visual embed
+    blur_text = "🎨 Blur applied" if apply_blur else "✅ No additional blur"
+    message_content = (
+        f"🎮 **Clip Submission for Review**\n\n"
+        f"Submitted by: {user_mention}\n"
+        f"Claimed rank: **{selected_rank}**\n"
+        f"Processing: {blur_text}\n"
+        f"File size: {original_size_mb:.1f}MB → {final_size_mb:.1f}MB\n\n"
+        f"React with ✅ to approve or ❌ to reject this clip."
+    )
+
+    # Create embed that shows video preview directly in Discord
+    embed = discord.Embed(
+        title="📹 Video Submission",
+        description=f"Video preview below - click link for full quality\n{blur_text}",
         color=0x7AB0E7
     )
-    
-    try:
-        message = await interaction.followup.send(embed=queue_embed, ephemeral=True)
-        processing_queue.append((user_id, message))
-        
-        # Start background task to update queue position
-        asyncio.create_task(update_queue_position(user_id))
-        
-        return position
-    except:
-        return position
+    embed.set_image(url=video_url)  # This shows the video preview in Discord
+    embed.add_field(name="🎬 Full Quality", value=f"[Open in browser]({video_url})", inline=False)
+    embed.add_field(name="👤 Submitter", value=user_mention, inline=True)
+    embed.add_field(name="🏆 Claimed Rank", value=f"**{selected_rank}**", inline=True)
+    embed.add_field(name="🎨 Processing", value=blur_text, inline=True)
+
+    moderation_message = await check_channel.send(message_content, embed=embed)
+    await moderation_message.add_reaction("✅")
+    await moderation_message.add_reaction("❌")
+
+    # Store moderation data
+    clip_data = {
+        'rank': selected_rank,
+        'user_id': job['user_id'],
+        'user_mention': user_mention,
+        'video_url': video_url,
+        'hosting': job.get('hosting'),
+        'file_size_mb': final_size_mb,
+        'guild_id': guild_id,
+        'blur_applied': apply_blur
+    }
 
-async def remove_from_queue(user_id: int):
-    """Remove user from queue and update positions for others"""
-    global processing_queue
-    
-    # Remove user from queue
-    processing_queue = [(uid, msg) for uid, msg in processing_queue if uid != user_id]
-    
-    # Update positions for remaining users
-    for i, (uid, message) in enumerate(processing_queue):
-        new_position = i + 1
-        try:
-            queue_embed = discord.Embed(
-                title="⏳ Queue Position Updated",
-                description=f"You are now **#{new_position}** in the queue.\nProcessing up to {MAX_CONCURRENT_PROCESSING} videos simultaneously.",
-                color=0x7AB0E7
-            )
-            await message.edit(embed=queue_embed)
-        except:
-            pass  # Message might be deleted or expired
-
-async def update_queue_position(user_id: int):
-    """Background task to update queue position every 2 minutes"""
-    while True:
-        await asyncio.sleep(120)  # 2 minutes
-        
-        # Find user in queue
-        user_found = False
-        for i, (uid, message) in enumerate(processing_queue):
-            if uid == user_id:
-                user_found = True
-                position = i + 1
-                try:
-                    queue_embed = discord.Embed(
-                        title="⏳ Queue Position Update",
-                        description=f"You are **#{position}** in the queue.\nProcessing up to {MAX_CONCURRENT_PROCESSING} videos simultaneously.\n\n*Updated every 2 minutes*",
-                        color=0x7AB0E7
-                    )
-                    await message.edit(embed=queue_embed)
-                except:
-                    pass  # Message might be deleted
-                break
-        
-        if not user_found:
-            break  # User no longer in queue, stop updating
+    if not hasattr(bot, 'pending_clips'):
+        bot.pending_clips = load_pending_clips()
+
+    # Ensure server structure exists
+    if guild_id not in bot.pending_clips:
+        bot.pending_clips[guild_id] = {}
+
+    # Store under the message ID
+    bot.pending_clips[guild_id][str(moderation_message.id)] = clip_data
+    save_pending_clips(guild_id)
+
+    processing_text = "with blur applied" if apply_blur else "without additional blur"
+    await job_queue.notify(job, content=f"✅ Video processed {processing_text} and uploaded successfully!\nFinal size: {final_size_mb:.1f}MB\nPreview will be visible in moderation channel.")
+
+
+async def stream_url_to_file(url: str, f, max_bytes: int = None) -> int:
+    """Copy a URL into an open binary file chunk by chunk, returns the number of bytes written"""
+    timeout = aiohttp.ClientTimeout(total=600)
+    total = 0
+    async with http.session.get(url, timeout=timeout) as response:
+        response.raise_for_status()
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            total += len(chunk)
+            if max_bytes and total > max_bytes:
+                raise ValueError(f"{url} is larger than {max_bytes / (1024 * 1024):.0f}MB")
+            f.write(chunk)
+    return total
+
+async def repost_attachment(attachment, channel, **send_kwargs) -> discord.Message:
+    """Send an attachment again in another channel through a temporary file on disk,
+    the clip is never held in RAM and the upload reads it back in chunks"""
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(attachment.filename)[1]) as temp_file:
+        await stream_url_to_file(attachment.url, temp_file)
+        temp_file.seek(0)
+        # discord.File wants the real file object, not the wrapper (reopening by name fails on Windows)
+        return await channel.send(file=discord.File(temp_file.file, filename=attachment.filename), **send_kwargs)
 
 async def download_video_from_url(url: str, max_size_mb: int = 200) -> str | None:
     try:
@@ -1342,120 +2067,785 @@ async def download_video_from_url(url: str, max_size_mb: int = 200) -> str | Non
         log_memory_usage("Download start")
         
         timeout = aiohttp.ClientTimeout(total=600) #10min timeout
-        headers = {"User-Agent": "Mozilla/5.0"}
 
-        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    print(f"❌ [DOWNLOAD] HTTP error: {response.status}")
-                    return None
+        async with http.session.get(url, timeout=timeout) as response:
+            if response.status != 200:
+                print(f"❌ [DOWNLOAD] HTTP error: {response.status}")
+                return None
 
-                content_type = response.headers.get("Content-Type", "")
-                content_length = response.headers.get("Content-Length")
-                
-                if content_length:
-                    size_mb = int(content_length) / (1024 * 1024)
-                    print(f"📏 [DOWNLOAD] File size: {size_mb:.1f}MB")
-                    if size_mb > max_size_mb:
-                        print(f"❌ [DOWNLOAD] File too large: {size_mb:.1f}MB > {max_size_mb}MB")
-                        return None
-                
-                if "video" not in content_type and not url.lower().endswith(tuple(video_extensions)):
-                    print(f"❌ [DOWNLOAD] Invalid content-type: {content_type}")
+            content_type = response.headers.get("Content-Type", "")
+            content_length = response.headers.get("Content-Length")
+            
+            if content_length:
+                size_mb = int(content_length) / (1024 * 1024)
+                print(f"📏 [DOWNLOAD] File size: {size_mb:.1f}MB")
+                if size_mb > max_size_mb:
+                    print(f"❌ [DOWNLOAD] File too large: {size_mb:.1f}MB > {max_size_mb}MB")
                     return None
-
-                suffix = os.path.splitext(url.split("?")[0])[1]
-                fd, temp_path = tempfile.mkstemp(suffix=suffix)
-                os.close(fd)
-
-                max_bytes = max_size_mb * 1024 * 1024
-                total_downloaded = 0
-                chunk_count = 0
-
-                print(f"📦 [DOWNLOAD] Downloading in chunks...")
-                with open(temp_path, "wb") as f:
-                    async for chunk in response.content.iter_chunked(32 * 1024):  # Smaller chunks for VPS
-                        total_downloaded += len(chunk)
-                        chunk_count += 1
-                        
-                        if total_downloaded > max_bytes:
-                            print(f"❌ [DOWNLOAD] File too large during download, aborting")
-                            os.remove(temp_path)
-                            return None
-                        f.write(chunk)
-                        
-                        # Log progress every 100 chunks (3.2MB)
-                        if chunk_count % 100 == 0:
-                            mb_downloaded = total_downloaded / (1024 * 1024)
-                            print(f"    📦 Downloaded: {mb_downloaded:.1f}MB")
-
-                final_size = total_downloaded / (1024 * 1024)
-                print(f"✅ [DOWNLOAD] Download completed: {final_size:.1f}MB")
-                log_memory_usage("Download completed")
-                return temp_path
-                
+            
+            if "video" not in content_type and not url.lower().endswith(tuple(video_extensions)):
+                print(f"❌ [DOWNLOAD] Invalid content-type: {content_type}")
+                return None
+
+            suffix = os.path.splitext(url.split("?")[0])[1]
+            fd, temp_path = tempfile.mkstemp(suffix=suffix)
+            os.close(fd)
+
+            max_bytes = max_size_mb * 1024 * 1024
+            total_downloaded = 0
+            chunk_count = 0
+
+            print(f"📦 [DOWNLOAD] Downloading in chunks...")
+            with open(temp_path, "wb") as f:
+                async for chunk in response.content.iter_chunked(32 * 1024):  # Smaller chunks for VPS
+                    total_downloaded += len(chunk)
+                    chunk_count += 1
+                    
+                    if total_downloaded > max_bytes:
+                        print(f"❌ [DOWNLOAD] File too large during download, aborting")
+                        os.remove(temp_path)
+                        return None
+                    f.write(chunk)
+                    
+                    # Log progress every 100 chunks (3.2MB)
+                    if chunk_count % 100 == 0:
+                        mb_downloaded = total_downloaded / (1024 * 1024)
+                        print(f"    📦 Downloaded: {mb_downloaded:.1f}MB")
+
+            final_size = total_downloaded / (1024 * 1024)
+            print(f"✅ [DOWNLOAD] Download completed: {final_size:.1f}MB")
+            log_memory_usage("Download completed")
+            return temp_path
+            
     except Exception as e:
         print(f"❌ [DOWNLOAD] Error: {e}")
         traceback.print_exc()
         return None
-def load_channel_config() -> Dict:
-    """Load channel configuration from JSON file"""
-    if os.path.exists(CHANNEL_CONFIG_FILE):
-        with open(CHANNEL_CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+def save_channel_config(guild_id: int, check_channel: str, guess_channel: str, results_channel: str):
+    """Save channel configuration to the guild's shard"""
+    storage.save_guild(CHANNEL_CONFIG_FILE, guild_id, {
+        'check_channel': check_channel,
+        'guess_channel': guess_channel,
+        'results_channel': results_channel
+    })
+    channels.invalidate(guild_id, names=True)
+
+class ChannelRegistry:
+    """In-memory check/guess/results channels per guild, resolved once by name"""
+
+    def __init__(self):
+        self.names_cache = {}
+        self.ids_cache = {}
+
+    def names(self, guild_id: int) -> tuple:
+        guild_id = int(guild_id)
+        if guild_id not in self.names_cache:
+            guild_config = storage.load_guild(CHANNEL_CONFIG_FILE, guild_id)
+            self.names_cache[guild_id] = (
+                guild_config.get('check_channel', CHECK_CHANNEL_NAME),
+                guild_config.get('guess_channel', GUESS_CHANNEL_NAME),
+                guild_config.get('results_channel', RESULTS_CHANNEL_NAME)
+            )
+        return self.names_cache[guild_id]
+
+    def ids(self, guild) -> tuple:
+        """(check_id, guess_id, results_id), None where the channel does not exist"""
+        if guild.id not in self.ids_cache:
+            ids = []
+            for name in self.names(guild.id):
+                channel = discord.utils.get(guild.channels, name=name)
+                ids.append(channel.id if channel else None)
+            self.ids_cache[guild.id] = tuple(ids)
+        return self.ids_cache[guild.id]
+
+    def _channel(self, guild, index: int):
+        channel_id = self.ids(guild)[index]
+        return guild.get_channel(channel_id) if channel_id else None
+
+    def check_channel(self, guild):
+        return self._channel(guild, 0)
+
+    def guess_channel(self, guild):
+        return self._channel(guild, 1)
+
+    def results_channel(self, guild):
+        return self._channel(guild, 2)
+
+    def invalidate(self, guild_id: int, names: bool = False):
+        """Drop resolved IDs of a guild, and its configured names when they changed"""
+        self.ids_cache.pop(int(guild_id), None)
+        if names:
+            self.names_cache.pop(int(guild_id), None)
+
+channels = ChannelRegistry()
+
+def get_channel_names(guild_id: int) -> tuple:
+    """Get configured channel names for a guild"""
+    return channels.names(guild_id)
+
+def normalize_pending_clips(data: dict) -> dict:
+    """Convert the legacy pending clips file to {guild_id: {message_id: clip_data}}"""
+    pending_clips = {}
+    for key, value in data.items():
+        try:
+            guild_id = int(key)
+            if isinstance(value, dict):
+                # Check if this is a server container or individual clip
+                if any(isinstance(v, dict) and 'rank' in v for v in value.values()):
+                    # This is a proper server container
+                    pending_clips.setdefault(guild_id, {}).update(value)
+                elif 'guild_id' in value:
+                    # This is an individual clip stored under its message ID
+                    pending_clips.setdefault(value['guild_id'], {})[key] = value
+                else:
+                    pending_clips.setdefault(guild_id, {})
+            else:
+                pending_clips.setdefault(guild_id, {})
+        except ValueError:
+            # Handle old format - this key is actually a message ID
+            if isinstance(value, dict) and 'guild_id' in value:
+                pending_clips.setdefault(value['guild_id'], {})[key] = value
+    return pending_clips
+
+def load_pending_clips() -> dict:
+    """Load clips awaiting moderation for every guild"""
+    return storage.load_all(CLIP_DATA_FILE)
+
+def save_pending_clips(guild_id: int):
+    """Persist the pending clips of a single guild"""
+    storage.save_guild(CLIP_DATA_FILE, guild_id, bot.pending_clips.get(guild_id, {}))
+    reaction_filter.sync_guild(guild_id, bot.pending_clips.get(guild_id, {}))
+
+class ReactionFilter:
+    """Message IDs awaiting moderation, so unrelated reactions are dropped without any lookup"""
+    EMOJIS = frozenset({"✅", "❌"})
+
+    def __init__(self):
+        self.message_ids = set()
+        self.guild_messages = {}
+        self.filtered = 0
+        self.handled = 0
+
+    def sync_guild(self, guild_id: int, clips: dict):
+        """Replace the tracked message IDs of a guild with its current pending clips"""
+        self.message_ids.difference_update(self.guild_messages.get(guild_id, ()))
+        ids = {int(message_id) for message_id in clips}
+        self.guild_messages[guild_id] = ids
+        self.message_ids.update(ids)
+
+    def rebuild(self, pending_clips: dict):
+        self.message_ids.clear()
+        self.guild_messages.clear()
+        for guild_id, clips in pending_clips.items():
+            self.sync_guild(guild_id, clips)
+
+    def accepts(self, payload) -> bool:
+        """True only for ✅/❌ on a pending moderation message, counts everything else as filtered"""
+        if payload.message_id in self.message_ids and str(payload.emoji) in self.EMOJIS:
+            self.handled += 1
+            return True
+        self.filtered += 1
+        return False
+
+reaction_filter = ReactionFilter()
+
+def cleanup_files(file_paths: List[str]):
+    """Clean up temporary files"""
+    for path in file_paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            print(f"Error cleaning up {path}: {e}")
+
+def atomic_write_text(path: str, text: str):
+    """Write text to a temp file next to path, fsync it, then rename it over path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # Rename is atomic, a crash leaves either the old or the new file, never half of one
+        os.replace(temp_path, path)
+    except Exception:
+        cleanup_files([temp_path])
+        raise
+
+
+class GuildShardStorage:
+    """Stores every data file as one shard per guild: <root>/<guild_id>/<filename>"""
+    def __init__(self, root: str):
+        self.root = root
+
+    def shard_path(self, filename: str, guild_id: int) -> str:
+        return os.path.join(self.root, str(guild_id), filename)
+
+    def load_guild(self, filename: str, guild_id: int) -> dict:
+        """Load a single guild's shard, reads cost O(that guild's data)"""
+        path = self.shard_path(filename, guild_id)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def encode_guild(self, filename: str, data: dict, keys: List[str] = None) -> str:
+        """Serialize a guild's data, called on the event loop for a consistent snapshot.
+        A shard is always rewritten whole, so the changed keys are not needed."""
+        return json.dumps(data, indent=2)
+
+    def write_guild(self, filename: str, guild_id: int, payload: str):
+        """Write an encoded guild, safe to call from a worker thread"""
+        path = self.shard_path(filename, guild_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_text(path, payload)
+
+    def save_guild(self, filename: str, guild_id: int, data: dict, keys: List[str] = None):
+        self.write_guild(filename, guild_id, self.encode_guild(filename, data, keys))
+
+    def guild_ids(self, filename: str) -> List[int]:
+        """Guilds that have a shard for this data file"""
+        if not os.path.isdir(self.root):
+            return []
+        guild_ids = []
+        for entry in os.listdir(self.root):
+            if entry.isdigit() and os.path.exists(self.shard_path(filename, entry)):
+                guild_ids.append(int(entry))
+        return guild_ids
+
+    def load_all(self, filename: str) -> dict:
+        """Load every guild's shard, keyed by int guild ID"""
+        return {guild_id: self.load_guild(filename, guild_id) for guild_id in self.guild_ids(filename)}
+
+    def migrate_legacy_file(self, filename: str, normalize=None):
+        """Split an old monolithic file (all guilds in one JSON) into per-guild shards"""
+        if not os.path.exists(filename):
+            return
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        if normalize:
+            data = normalize(data)
+
+        for guild_id, guild_data in data.items():
+            # Legacy data wins only if nothing was written to the shard yet
+            if not os.path.exists(self.shard_path(filename, guild_id)):
+                self.save_guild(filename, guild_id, guild_data)
+
+        os.replace(filename, filename + '.migrated')
+        print(f"💾 [STORAGE] Migrated {filename} into {len(data)} guild shard(s)")
+
+    def close(self):
+        pass
+
+    def migrate_legacy_files(self):
+        self.migrate_legacy_file(RESULTS_DATA_FILE)
+        self.migrate_legacy_file(SCORES_DATA_FILE)
+        self.migrate_legacy_file(CHANNEL_CONFIG_FILE)
+        self.migrate_legacy_file(CLIP_DATA_FILE, normalize=normalize_pending_clips)
+
+
+class SqliteStorage:
+    """SQLite (WAL mode) backend with the GuildShardStorage interface plus indexed queries"""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS clips (
+            guild_id INTEGER NOT NULL,
+            clip_id TEXT NOT NULL,
+            expired INTEGER NOT NULL DEFAULT 0,
+            end_time TEXT,
+            correct_rank TEXT,
+            total_votes INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL,
+            PRIMARY KEY (guild_id, clip_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_clips_expiry ON clips (guild_id, expired, end_time);
+        CREATE TABLE IF NOT EXISTS votes (
+            guild_id INTEGER NOT NULL,
+            clip_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            rank TEXT NOT NULL,
+            PRIMARY KEY (guild_id, clip_id, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS scores (
+            guild_id INTEGER NOT NULL,
+            user_id TEXT NOT NULL,
+            total_score INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        );
+        DROP INDEX IF EXISTS idx_scores_total;
+        CREATE TABLE IF NOT EXISTS pending_clips (
+            guild_id INTEGER NOT NULL,
+            message_id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (guild_id, message_id)
+        );
+        CREATE TABLE IF NOT EXISTS channel_config (
+            guild_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TEXT NOT NULL
+        );
+    """
+    TABLES = {
+        RESULTS_DATA_FILE: 'clips',
+        SCORES_DATA_FILE: 'scores',
+        CLIP_DATA_FILE: 'pending_clips',
+        CHANNEL_CONFIG_FILE: 'channel_config'
+    }
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Shared between the loop and the writer thread, guarded by self._lock
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(self.SCHEMA)
+        return self._conn
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def load_guild(self, filename: str, guild_id: int) -> dict:
+        table = self.TABLES[filename]
+        if table == 'clips':
+            clips = {}
+            for clip_id, data in self._query('SELECT clip_id, data FROM clips WHERE guild_id = ?', (guild_id,)):
+                clips[clip_id] = json.loads(data)
+                clips[clip_id]['user_votes'] = {}
+            rows = self._query('SELECT clip_id, user_id, rank FROM votes WHERE guild_id = ? ORDER BY rowid', (guild_id,))
+            for clip_id, user_id, rank in rows:
+                if clip_id in clips:
+                    clips[clip_id]['user_votes'][user_id] = rank
+            return clips
+        if table == 'scores':
+            rows = self._query('SELECT user_id, data FROM scores WHERE guild_id = ?', (guild_id,))
+            return {user_id: json.loads(data) for user_id, data in rows}
+        if table == 'pending_clips':
+            rows = self._query('SELECT message_id, data FROM pending_clips WHERE guild_id = ?', (guild_id,))
+            return {message_id: json.loads(data) for message_id, data in rows}
+        rows = self._query('SELECT data FROM channel_config WHERE guild_id = ?', (guild_id,))
+        return json.loads(rows[0][0]) if rows else {}
+
+    def encode_guild(self, filename: str, data: dict, keys: List[str] = None):
+        """Turn a guild's data into (rows to upsert, keys to delete), called on the event loop for a
+        consistent snapshot. With keys only those records are encoded, keys missing from data were
+        removed. Without keys every record is encoded and the delete list is None (anything else goes)."""
+        table = self.TABLES[filename]
+        if table == 'channel_config':
+            return json.dumps(data)
+        if keys is None:
+            keys, removed = list(data), None
+        else:
+            removed = [key for key in keys if key not in data]
+            keys = [key for key in keys if key in data]
+        if table == 'clips':
+            clip_rows, vote_rows = [], []
+            for clip_id in keys:
+                clip_data = data[clip_id]
+                # Votes live in their own table, the rest of the clip stays a JSON document
+                clip_doc = {k: v for k, v in clip_data.items() if k != 'user_votes'}
+                clip_rows.append((
+                    clip_id, int(bool(clip_data.get('expired', False))), clip_data.get('end_time'),
+                    clip_data.get('correct_rank'), clip_data.get('total_votes', 0), json.dumps(clip_doc)
+                ))
+                for user_id, rank in clip_data.get('user_votes', {}).items():
+                    vote_rows.append((clip_id, user_id, rank))
+            return (clip_rows, vote_rows), removed
+        if table == 'scores':
+            return [(user_id, data[user_id].get('total_score', 0), json.dumps(data[user_id])) for user_id in keys], removed
+        return [(message_id, json.dumps(data[message_id])) for message_id in keys], removed
+
+    UPSERTS = {
+        'clips': 'INSERT INTO clips (guild_id, clip_id, expired, end_time, correct_rank, total_votes, data) VALUES (?, ?, ?, ?, ?, ?, ?) '
+                 'ON CONFLICT (guild_id, clip_id) DO UPDATE SET expired = excluded.expired, end_time = excluded.end_time, '
+                 'correct_rank = excluded.correct_rank, total_votes = excluded.total_votes, data = excluded.data',
+        'votes': 'INSERT INTO votes (guild_id, clip_id, user_id, rank) VALUES (?, ?, ?, ?) '
+                 'ON CONFLICT (guild_id, clip_id, user_id) DO UPDATE SET rank = excluded.rank',
+        'scores': 'INSERT INTO scores (guild_id, user_id, total_score, data) VALUES (?, ?, ?, ?) '
+                  'ON CONFLICT (guild_id, user_id) DO UPDATE SET total_score = excluded.total_score, data = excluded.data',
+        'pending_clips': 'INSERT INTO pending_clips (guild_id, message_id, data) VALUES (?, ?, ?) '
+                         'ON CONFLICT (guild_id, message_id) DO UPDATE SET data = excluded.data'
+    }
+    KEY_COLUMNS = {'clips': 'clip_id', 'scores': 'user_id', 'pending_clips': 'message_id'}
+
+    def write_guild(self, filename: str, guild_id: int, payload):
+        """Upsert the encoded rows and delete removed keys in one transaction, safe to call from a worker thread"""
+        table = self.TABLES[filename]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                if table == 'channel_config':
+                    conn.execute('INSERT OR REPLACE INTO channel_config (guild_id, data) VALUES (?, ?)', (guild_id, payload))
+                    return
+                rows, removed = payload
+                if table == 'clips':
+                    rows, vote_rows = rows
+                key_column = self.KEY_COLUMNS[table]
+                if removed is None:
+                    # Whole guild written, whatever is stored but not in it was removed
+                    written = {row[0] for row in rows}
+                    stored = conn.execute(f'SELECT {key_column} FROM {table} WHERE guild_id = ?', (guild_id,)).fetchall()
+                    removed = [key for key, in stored if key not in written]
+                for key in removed:
+                    conn.execute(f'DELETE FROM {table} WHERE guild_id = ? AND {key_column} = ?', (guild_id, key))
+                    if table == 'clips':
+                        conn.execute('DELETE FROM votes WHERE guild_id = ? AND clip_id = ?', (guild_id, key))
+                conn.executemany(self.UPSERTS[table], [(guild_id, *row) for row in rows])
+                if table == 'clips':
+                    conn.executemany(self.UPSERTS['votes'], [(guild_id, *row) for row in vote_rows])
+
+    def save_guild(self, filename: str, guild_id: int, data: dict, keys: List[str] = None):
+        """keys names the records that changed, only those rows are written"""
+        self.write_guild(filename, guild_id, self.encode_guild(filename, data, keys))
+
+    def guild_ids(self, filename: str) -> List[int]:
+        table = self.TABLES[filename]
+        return [row[0] for row in self._query(f'SELECT DISTINCT guild_id FROM {table}')]
+
+    def load_all(self, filename: str) -> dict:
+        return {guild_id: self.load_guild(filename, guild_id) for guild_id in self.guild_ids(filename)}
+
+    def query_finished_clips(self, guild_id: int, limit: int) -> list:
+        """Newest expired clips of a guild using idx_clips_expiry"""
+        rows = self._query(
+            'SELECT clip_id, end_time, correct_rank, total_votes FROM clips '
+            'WHERE guild_id = ? AND expired = 1 ORDER BY end_time DESC LIMIT ?',
+            (guild_id, limit)
+        )
+        return [
+            {'clip_id': clip_id, 'end_time': end_time, 'correct_rank': correct_rank, 'total_votes': total_votes}
+            for clip_id, end_time, correct_rank, total_votes in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def migrate_legacy_files(self):
+        """One-shot import of the JSON data (monolithic files or per-guild shards)"""
+        json_storage = GuildShardStorage(DATA_DIR)
+        for filename in self.TABLES:
+            name = f"import:{filename}"
+            if self._query('SELECT 1 FROM migrations WHERE name = ?', (name,)):
+                continue
+
+            if os.path.exists(filename):
+                with open(filename, 'r') as f:
+                    data = json.load(f)
+                if filename == CLIP_DATA_FILE:
+                    data = normalize_pending_clips(data)
+                data = {int(guild_id): guild_data for guild_id, guild_data in data.items()}
+            else:
+                data = json_storage.load_all(filename)
+
+            for guild_id, guild_data in data.items():
+                self.save_guild(filename, guild_id, guild_data)
+
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.execute('INSERT INTO migrations (name, applied_at) VALUES (?, ?)', (name, datetime.now().isoformat()))
+            if data:
+                print(f"💾 [STORAGE] Imported {filename} for {len(data)} guild(s) into {self.path}")
+
+
+if STORAGE_BACKEND == 'sqlite':
+    storage = SqliteStorage(SQLITE_DB_FILE)
+else:
+    storage = GuildShardStorage(DATA_DIR)
+
+
+class ResultsStore:
+    """Resident copy of clip results, persisted by a write-behind background writer"""
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.data = {}
+        self.loaded = False
+        self.dirty_guilds = set()
+        self.dirty_clips = {}
+        self.flushing_guilds = set()
+        self.pending_updates = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._writer_task = None
+
+    def load(self):
+        """Read the results file once, later reads are served from memory"""
+        self.data = storage.load_all(self.filename)
+        self.loaded = True
+        print(f"💾 [STORE] Loaded results for {len(self.data)} guild(s)")
+
+    def mark_dirty(self, guild_id: int = None, clip_ids=None):
+        """Flag clips of a guild (every clip without clip_ids, every guild without guild_id) as changed"""
+        if guild_id is None:
+            for guild_id in self.data:
+                self._mark_clips(guild_id, None)
+        else:
+            self._mark_clips(guild_id, clip_ids)
+        self.pending_updates += 1
+        # Don't wait for the timer if a burst of votes piles up
+        if self.pending_updates >= RESULTS_FLUSH_BATCH:
+            self._wakeup.set()
+
+    def _mark_clips(self, guild_id: int, clip_ids):
+        # None in dirty_clips means the whole guild is written
+        if clip_ids is None or self.dirty_clips.get(guild_id, set()) is None:
+            self.dirty_clips[guild_id] = None
+        else:
+            self.dirty_clips.setdefault(guild_id, set()).update(clip_ids)
+        self.dirty_guilds.add(guild_id)
+
+    def start(self):
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer())
+
+    async def _writer(self):
+        """Coalesce dirty guilds and flush them on a timer or once the batch is full"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=RESULTS_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ [STORE] Flush failed: {e}")
+
+    async def flush(self) -> set:
+        """Write dirty guilds, returns the guilds that failed to write"""
+        async with self._flush_lock:
+            if not self.dirty_guilds:
+                return set()
+            dirty = self.dirty_guilds
+            dirty_clips = self.dirty_clips
+            self.dirty_guilds = set()
+            self.dirty_clips = {}
+            self.flushing_guilds = set(dirty)
+            self.pending_updates = 0
+
+            # Only dirty guilds are written, SQLite only touches their dirty clips
+            failed = set()
+            for guild_id in dirty:
+                # Serialize on the loop so the snapshot is consistent, write it from a thread
+                payload = storage.encode_guild(self.filename, self.data.get(guild_id, {}), dirty_clips.get(guild_id))
+                try:
+                    await asyncio.to_thread(storage.write_guild, self.filename, guild_id, payload)
+                except Exception as e:
+                    print(f"❌ [STORE] Failed to write guild {guild_id}: {e}")
+                    failed.add(guild_id)
+            self.flushing_guilds = set()
+            if failed:
+                # Keep the clips dirty so the next flush retries them
+                for guild_id in failed:
+                    self._mark_clips(guild_id, dirty_clips.get(guild_id))
+                dirty -= failed
+            if dirty:
+                print(f"💾 [STORE] Flushed {len(dirty)} dirty guild(s)")
+            return failed
+
+    def is_persisted(self, guild_id: int) -> bool:
+        """True when the backend holds the same data as memory for this guild"""
+        return guild_id not in self.dirty_guilds and guild_id not in self.flushing_guilds
+
+    def finished_clips(self, guild_id: int, limit: int = 25) -> list:
+        """Newest expired clips of a guild, as dicts with clip_id/end_time/correct_rank/total_votes"""
+        if hasattr(storage, 'query_finished_clips') and self.is_persisted(guild_id):
+            return storage.query_finished_clips(guild_id, limit)
+
+        finished = [
+            {
+                'clip_id': clip_id,
+                'end_time': clip_data['end_time'],
+                'correct_rank': clip_data.get('correct_rank', 'Unknown'),
+                'total_votes': clip_data.get('total_votes', 0)
+            }
+            for clip_id, clip_data in self.data.get(guild_id, {}).items() if clip_data.get('expired', False)
+        ]
+        finished.sort(key=lambda x: x['end_time'], reverse=True)
+        return finished[:limit]
+
+    async def close(self):
+        """Stop the writer and flush whatever is still pending"""
+        if self._writer_task:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        await self.flush()
+
+
+results_store = ResultsStore(RESULTS_DATA_FILE)
+
+def apply_vote_event(results_data: dict, event: dict) -> bool:
+    """Replay a journaled vote, events carry the resulting state so replaying twice is harmless"""
+    clip_data = results_data.get(event['guild_id'], {}).get(event['clip_id'])
+    if clip_data is None:
+        return False  # Clip was cleaned up since
+
+    user_id = event['user_id']
+    clip_data.setdefault('user_votes', {})[user_id] = event['rank']
+    clip_data.setdefault('user_vote_count', {})[user_id] = event['vote_count']
+    if event.get('username'):
+        clip_data.setdefault('voter_names', {})[user_id] = event['username']
+
+    # Recount the aggregates from the individual votes
+    votes = {}
+    for rank in clip_data['user_votes'].values():
+        votes[rank] = votes.get(rank, 0) + 1
+    clip_data['votes'] = votes
+    clip_data['total_votes'] = len(clip_data['user_votes'])
+    clip_data['correct_votes'] = votes.get(clip_data.get('correct_rank'), 0)
+    return True
+
+
+class VoteJournal:
+    """Append-only log of votes: one JSON line per vote, folded into the results snapshot on a schedule"""
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.active_path = os.path.join(directory, 'votes.jsonl')
+        self.meta_path = os.path.join(directory, 'journal_meta.json')
+        self.last_seq = 0
+        self.compacted_through = 0
+        self.touched_clips = {}
+        self._file = None
+        self._first_active_seq = None
+        self._lock = asyncio.Lock()
+        self._compactor_task = None
+
+    def _segment_paths(self) -> List[str]:
+        """Rotated segments named votes-<first seq>-<last seq>.jsonl, oldest first"""
+        segments = [name for name in os.listdir(self.directory) if name.startswith('votes-') and name.endswith('.jsonl')]
+        return [os.path.join(self.directory, name) for name in sorted(segments)]
+
+    def open(self, results_data: dict):
+        """Rebuild the resident results from snapshot + journal, then open the journal for appends"""
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r') as f:
+                self.compacted_through = json.load(f).get('compacted_through', 0)
+        self.last_seq = self.compacted_through
+
+        replayed = 0
+        for path in self._segment_paths() + [self.active_path]:
+            if not os.path.exists(path):
+                continue
+            # Segment names carry their last seq, fully compacted ones don't need to be read
+            if path != self.active_path and int(os.path.basename(path)[:-6].split('-')[2]) <= self.compacted_through:
+                continue
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from a crash mid-write
+                    self.last_seq = max(self.last_seq, event['seq'])
+                    if path == self.active_path and self._first_active_seq is None:
+                        self._first_active_seq = event['seq']
+                    if event['seq'] > self.compacted_through and apply_vote_event(results_data, event):
+                        self.touched_clips.setdefault(event['guild_id'], set()).add(event['clip_id'])
+                        replayed += 1
+
+        self._file = open(self.active_path, 'a')
+        print(f"📝 [JOURNAL] Replayed {replayed} vote(s) on top of the snapshot")
+
+    def append(self, event: dict):
+        """O(1) sequential write of a vote event"""
+        self.last_seq += 1
+        event = {'seq': self.last_seq, 'time': datetime.now().isoformat(), **event}
+        self._file.write(json.dumps(event, separators=(',', ':')) + '\n')
+        self._file.flush()
+        if self._first_active_seq is None:
+            self._first_active_seq = self.last_seq
+        self.touched_clips.setdefault(event['guild_id'], set()).add(event['clip_id'])
+
+    def _rotate(self):
+        """Move the active journal aside as an audit segment and start a fresh one"""
+        self._file.close()
+        if self._first_active_seq is not None:
+            segment_name = f"votes-{self._first_active_seq:012d}-{self.last_seq:012d}.jsonl"
+            os.replace(self.active_path, os.path.join(self.directory, segment_name))
+        self._first_active_seq = None
+        self._file = open(self.active_path, 'a')
+
+    async def compact(self):
+        """Fold journaled votes into the results snapshot and record how far the snapshot goes"""
+        async with self._lock:
+            if self.last_seq <= self.compacted_through:
+                return
+            through = self.last_seq
+            touched = self.touched_clips
+            self.touched_clips = {}
+            self._rotate()
+
+            for guild_id, clip_ids in touched.items():
+                results_store.mark_dirty(guild_id, clip_ids)
+            failed = await results_store.flush()
+
+            if touched.keys() & failed:
+                # Snapshot incomplete, replay will cover these votes until the next attempt
+                for guild_id, clip_ids in touched.items():
+                    self.touched_clips.setdefault(guild_id, set()).update(clip_ids)
+                return
 
-def save_channel_config(guild_id: int, check_channel: str, guess_channel: str, results_channel: str):
-    """Save channel configuration to JSON file"""
-    config = load_channel_config()
-    config[str(guild_id)] = {
-        'check_channel': check_channel,
-        'guess_channel': guess_channel,
-        'results_channel': results_channel
-    }
-    with open(CHANNEL_CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=2)
+            await asyncio.to_thread(atomic_write_text, self.meta_path, json.dumps({'compacted_through': through}))
+            self.compacted_through = through
+            print(f"📝 [JOURNAL] Compacted votes up to #{through} into the snapshot")
 
-def get_channel_names(guild_id: int) -> tuple:
-    """Get configured channel names for a guild"""
-    config = load_channel_config()
-    guild_config = config.get(str(guild_id), {})
-    
-    check_channel = guild_config.get('check_channel', CHECK_CHANNEL_NAME)
-    guess_channel = guild_config.get('guess_channel', GUESS_CHANNEL_NAME) 
-    results_channel = guild_config.get('results_channel', RESULTS_CHANNEL_NAME)    
-    return check_channel, guess_channel, results_channel   
+    def start(self):
+        if self._compactor_task is None:
+            self._compactor_task = asyncio.create_task(self._compactor())
 
-def cleanup_files(file_paths: List[str]):
-    """Clean up temporary files"""
-    for path in file_paths:
-        try:
-            if os.path.exists(path):
-                os.remove(path)
-        except Exception as e:
-            print(f"Error cleaning up {path}: {e}")
+    async def _compactor(self):
+        while True:
+            await asyncio.sleep(JOURNAL_COMPACT_INTERVAL)
+            try:
+                await self.compact()
+            except Exception as e:
+                print(f"❌ [JOURNAL] Compaction failed: {e}")
+
+    async def close(self):
+        """Stop the compactor, fold what is left and close the journal"""
+        if self._compactor_task:
+            self._compactor_task.cancel()
+            try:
+                await self._compactor_task
+            except asyncio.CancelledError:
+                pass
+            self._compactor_task = None
+        if self._file:
+            await self.compact()
+            self._file.close()
+            self._file = None
+
+
+vote_journal = VoteJournal(JOURNAL_DIR)
 
 def load_results_data():
-    """Load results data with server-specific structure"""
-    if os.path.exists(RESULTS_DATA_FILE):
-        with open(RESULTS_DATA_FILE, 'r') as f:
-            data = json.load(f)
-            # Convert string server IDs back to int, but keep clip IDs as strings
-            server_data = {}
-            for server_id, clips in data.items():
-                server_data[int(server_id)] = clips  # Don't convert clip_id keys to int
-            return server_data
-    return {}
-
-def save_results_data(data):
-    """Save results data with server-specific structure"""
-    # Convert int server IDs to strings for JSON serialization, keep clip IDs as strings
-    server_data = {}
-    for server_id, clips in data.items():
-        server_data[str(server_id)] = clips  # Keep clip data as-is
-    
-    with open(RESULTS_DATA_FILE, 'w') as f:
-        json.dump(server_data, f, indent=2)
+    """Load results data with server-specific structure (served from the resident store)"""
+    if not results_store.loaded:
+        results_store.load()
+    return results_store.data
+
+def save_results_data(data, guild_id: int = None, clip_ids=None):
+    """Queue results data for the background writer, only guild_id (and its clip_ids) if given"""
+    if data is not results_store.data:
+        results_store.data = data
+        results_store.loaded = True
+    results_store.mark_dirty(guild_id, clip_ids)
 
 def save_vote(clip_id, rank, user_id, guild_id):
     """Save a vote for a specific server"""
@@ -1528,7 +2918,7 @@ def save_vote(clip_id: str, guessed_rank: str, user_id: int):
     save_results_data(results_data)
     return True
 
-def get_results_embed(clip_id: str, guild_id: int) -> tuple[discord.Embed, str, str]:
+async def get_results_embed(clip_id: str, guild_id: int) -> tuple[discord.Embed, str, str]:
     """Generate results embed with percentages for a specific server (original function for auto-results)"""
     results_data = load_results_data()
     
@@ -1539,7 +2929,7 @@ def get_results_embed(clip_id: str, guild_id: int) -> tuple[discord.Embed, str,
     clip_data = results_data[guild_id][clip_id]
     correct_rank = clip_data.get('correct_rank', 'Unknown')
     total_votes = clip_data.get('total_votes', 0)
-    video_url = clip_data.get('video_url', None)
+    video_url = await hosting.current_url(clip_data.get('hosting'), clip_data.get('video_url'))
     submitter_id = clip_data.get('submitter_id', None)
     
     # Calculate correct guess percentage
@@ -1602,86 +2992,125 @@ async def register_persistent_views():
                         bot.add_view(view)
                         print(f"Registered persistent view for clip {clip_id} in guild {guild_id}")
                     else:
-                        # Clip should have expired, mark it as such
-                        clip_data['expired'] = True
-                        print(f"Marked clip {clip_id} as expired during registration")
+                        # Overdue clips are settled by the expiry scheduler as soon as it starts
+                        print(f"Clip {clip_id} expired while offline, results will be posted now")
                 except Exception as e:
                     print(f"Error registering view for clip {clip_id}: {e}")
-    
-    # Save any changes made during registration
-    save_results_data(results_data)
 
-async def check_expired_clips():
-    """Check for expired clips and post results for each server"""
+async def expire_clip(guild_id: int, clip_id: str):
+    """Close voting on a clip, settle scores and post its results"""
     results_data = load_results_data()
-    current_time = datetime.now()
+    clip_data = results_data.get(guild_id, {}).get(clip_id)
+    if not clip_data or clip_data.get('expired', False):
+        return  # Cleaned up or already settled
     
-    for guild_id, server_clips in results_data.items():
-        for clip_id, clip_data in server_clips.items():
-            if clip_data.get('expired', False):
-                continue
-                
-            end_time = datetime.fromisoformat(clip_data['end_time'])
+    print(f"⏰ [EXPIRED] Clip {clip_id} in guild {guild_id} has expired")
+    
+    # Mark as expired
+    clip_data['expired'] = True
+    save_results_data(results_data, guild_id, [clip_id])
+    
+    # Calculate scores for all users who voted
+    correct_rank = clip_data.get('correct_rank', 'Unknown')
+    user_votes = clip_data.get('user_votes', {})
+    
+    guild = bot.get_guild(guild_id)
+    if guild:
+        # Names come from the vote records or the member cache, never one REST call per voter
+        voter_names = clip_data.get('voter_names', {})
+        usernames = {}
+        for user_id_str in user_votes:
+            member = guild.get_member(int(user_id_str))
+            usernames[user_id_str] = member.display_name if member else voter_names.get(user_id_str)
+        try:
+            settle_clip_scores(guild_id, correct_rank, user_votes, usernames)
+        except Exception as e:
+            print(f"    ❌ Error settling scores for clip {clip_id}: {e}")
+    
+    # Find the results channel for this specific server
+    if guild:
+        results_channel = channels.results_channel(guild)
+        
+        if results_channel:
+            # Get results
+            results_embed, ping_content, video_url = await get_results_embed(clip_id, guild_id)
             
-            if current_time > end_time:
-                print(f"⏰ [EXPIRED] Clip {clip_id} in guild {guild_id} has expired")
-                
-                # Mark as expired
-                clip_data['expired'] = True
-                
-                # Calculate scores for all users who voted
-                correct_rank = clip_data.get('correct_rank', 'Unknown')
-                user_votes = clip_data.get('user_votes', {})
-                
-                guild = bot.get_guild(guild_id)
-                if guild:
-                    for user_id_str, guessed_rank in user_votes.items():
-                        try:
-                            user_id = int(user_id_str)
-                            user = bot.get_user(user_id)
-                            if not user:
-                                user = await bot.fetch_user(user_id)
-                            
-                            if user:
-                                username = user.display_name
-                                points, streak = update_user_score(user_id, guild_id, guessed_rank, correct_rank, username)
-                                print(f"    📊 Updated {username}: {points} points (streak: {streak})")
-                        except Exception as e:
-                            print(f"    ❌ Error updating score for user {user_id_str}: {e}")
-                
-                # Disable the voting view
+            if results_embed:
                 try:
-                    temp_view = GuessRankSelector(clip_id, clip_data.get('correct_rank', 'Unknown'))
-                    await temp_view.disable_view_in_message(guild_id)
-                    print(f"    ✅ Disabled voting view for clip {clip_id}")
-                except Exception as e:
-                    print(f"    ❌ Error disabling view for clip {clip_id}: {e}")
-                
-                # Find the results channel for this specific server
-                if guild:
-                    _, _, results_channel_name = get_channel_names(guild.id)
-                    results_channel = discord.utils.get(guild.channels, name=results_channel_name)
+                    await results_channel.send(
+                        content=ping_content,
+                        embed=results_embed
+                    )
+                    print(f"    ✅ Posted results for clip {clip_id} to {results_channel.name}")
                     
-                    if results_channel:
-                        # Get results
-                        results_embed, ping_content, video_url = get_results_embed(clip_id, guild_id)
-                        
-                        if results_embed:
-                            try:
-                                await results_channel.send(
-                                    content=ping_content,
-                                    embed=results_embed
-                                )
-                                print(f"    ✅ Posted results for clip {clip_id} to {results_channel.name}")
-                                
-                            except Exception as e:
-                                print(f"    ❌ Error posting results to {guild.name}: {e}")
-                    else:
-                        print(f"    ❌ Results channel '{results_channel_name}' not found in guild {guild.name}")
-                else:
-                    print(f"    ❌ Guild {guild_id} not found")
+                except Exception as e:
+                    print(f"    ❌ Error posting results to {guild.name}: {e}")
+        else:
+            print(f"    ❌ Results channel '{get_channel_names(guild.id)[2]}' not found in guild {guild.name}")
+    else:
+        print(f"    ❌ Guild {guild_id} not found")
     
-    save_results_data(results_data)
+    # Disable the voting view last, it lingers 10 seconds before deleting the message
+    try:
+        temp_view = GuessRankSelector(clip_id, clip_data.get('correct_rank', 'Unknown'))
+        await temp_view.disable_view_in_message(guild_id)
+        print(f"    ✅ Disabled voting view for clip {clip_id}")
+    except Exception as e:
+        print(f"    ❌ Error disabling view for clip {clip_id}: {e}")
+
+
+class ExpiryScheduler:
+    """Min-heap of active clip deadlines, sleeps exactly until the next one"""
+    MAX_SLEEP = 3600  # Re-check at least hourly in case the wall clock jumps
+
+    def __init__(self):
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def load(self, results_data: dict):
+        """Queue every active clip, end_time is parsed once here instead of every minute"""
+        for guild_id, server_clips in results_data.items():
+            for clip_id, clip_data in server_clips.items():
+                if not clip_data.get('expired', False):
+                    end_time = datetime.fromisoformat(clip_data['end_time'])
+                    heapq.heappush(self._heap, (end_time.timestamp(), guild_id, clip_id))
+        print(f"⏰ [SCHEDULER] Tracking {len(self._heap)} active clip(s)")
+
+    def schedule(self, guild_id: int, clip_id: str, end_time: datetime):
+        heapq.heappush(self._heap, (end_time.timestamp(), guild_id, clip_id))
+        # Wake the sleeper so it can re-arm on the new deadline if it is the earliest
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, guild_id, clip_id = heapq.heappop(self._heap)
+                # Settle in its own task so a slow clip doesn't delay the next deadline
+                asyncio.create_task(self._expire(guild_id, clip_id))
+
+            timeout = self.MAX_SLEEP
+            if self._heap:
+                timeout = min(max(self._heap[0][0] - time.time(), 0), self.MAX_SLEEP)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _expire(self, guild_id: int, clip_id: str):
+        try:
+            await expire_clip(guild_id, clip_id)
+        except Exception as e:
+            print(f"Error expiring clip {clip_id}: {e}")
+
+
+expiry_scheduler = ExpiryScheduler()
 
 
 async def save_video_from_attachment(attachment: discord.Attachment) -> Optional[str]:
@@ -1699,8 +3128,9 @@ async def save_video_from_attachment(attachment: discord.Attachment) -> Optional
     os.close(fd)
     
     try:
-        # DL File
-        await attachment.save(temp_path)
+        # DL File, streamed to disk (attachment.save() would hold the whole video in memory first)
+        with open(temp_path, 'wb') as f:
+            await stream_url_to_file(attachment.url, f)
         return temp_path
     except Exception as e:
         print(f"Download error: {e}")
@@ -1713,31 +3143,724 @@ import tempfile
 import asyncio
 import subprocess
 
-async def blur_video(input_path: str, target_size_mb: int = 25, apply_blur: bool = True) -> str:
-    """Apply adaptive blur and compress video using FFmpeg with optimized quality for Catbox."""
+def format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+async def run_ffmpeg(ffmpeg_cmd: List[str], duration: float, on_progress=None) -> tuple:
+    """Run ffmpeg reading its -progress stream as it goes, returns (returncode, last log lines).
+    on_progress(percent, fps, eta_seconds) is awaited at most every FFMPEG_PROGRESS_INTERVAL seconds."""
+    cmd = ffmpeg_cmd[:1] + ['-progress', 'pipe:1', '-nostats'] + ffmpeg_cmd[1:]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+
+    # Drain stderr concurrently so the pipe never fills up, keeping only the tail in memory
+    log_tail = deque(maxlen=FFMPEG_LOG_TAIL_LINES)
+    async def drain_stderr():
+        async for line in proc.stderr:
+            log_tail.append(line.decode(errors='replace').rstrip())
+    stderr_task = asyncio.create_task(drain_stderr())
+
+    started = time.time()
+    last_report = started
+    block = {}
+    try:
+        while True:
+            try:
+                line = await asyncio.wait_for(proc.stdout.readline(), timeout=FFMPEG_STALL_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise Exception(f"FFmpeg stalled, no progress for {FFMPEG_STALL_TIMEOUT}s")
+            if not line:
+                break
+
+            key, _, value = line.decode(errors='replace').strip().partition('=')
+            block[key] = value
+            if key != 'progress':
+                continue
+
+            # A "progress=" line closes a block of stats
+            try:
+                encoded = int(block.get('out_time_us', 0)) / 1_000_000
+            except ValueError:
+                encoded = 0  # N/A before the first frame
+            try:
+                fps = float(block.get('fps', 0))
+            except ValueError:
+                fps = 0
+            percent = min(encoded / duration * 100, 100) if duration else 0
+            elapsed = time.time() - started
+            eta = elapsed * (100 - percent) / percent if percent > 0 else None
+
+            now = time.time()
+            if value == 'continue' and now - last_report >= FFMPEG_PROGRESS_INTERVAL:
+                last_report = now
+                print(f"    ⏳ [FFMPEG] {percent:.0f}% at {fps:.0f}fps, ETA {format_eta(eta) if eta is not None else '?'}")
+                if on_progress:
+                    try:
+                        await on_progress(percent, fps, eta)
+                    except Exception as e:
+                        print(f"    ⚠️ [FFMPEG] Progress report failed: {e}")
+            block = {}
+
+        await proc.wait()
+    finally:
+        # Timeout, stall or cancellation: don't leave an orphan ffmpeg eating the CPU
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        await stderr_task
+
+    return proc.returncode, list(log_tail)
+
+async def probe_video(input_path: str) -> dict:
+    """ffprobe the container and streams of a video"""
+    probe_cmd = [
+        'ffprobe', '-v', 'quiet', '-print_format', 'json',
+        '-show_format', '-show_streams', input_path
+    ]
+    probe_proc = await asyncio.create_subprocess_exec(
+        *probe_cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await probe_proc.communicate()
+    if probe_proc.returncode != 0:
+        raise Exception(f"FFprobe failed: {stderr.decode()}")
+    return json.loads(stdout.decode())
+
+BLUR_FILTER = 'boxblur=lr=8:cr=4'
+
+def link_or_copy(source: str, destination: str):
+    """Hard link when source and destination share a filesystem, copy otherwise"""
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+class MediaCache:
+    """Probe metadata and encoded outputs keyed by a streaming hash of the input file.
+    Outputs are evicted least recently used first once MEDIA_CACHE_MAX_MB or MEDIA_CACHE_MAX_ENTRIES is exceeded."""
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, directory: str, max_mb: int, max_entries: int):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.max_bytes = max_mb * 1024 * 1024
+        self.max_entries = max_entries
+        self.entries = None
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"❌ [CACHE] Unreadable index, starting empty: {e}")
+        # Forget outputs whose file disappeared
+        for entry in self.entries.values():
+            entry['outputs'] = {
+                variant: output for variant, output in entry.get('outputs', {}).items()
+                if os.path.exists(os.path.join(self.directory, output['file']))
+            }
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write_text(self.index_path, json.dumps(self.entries))
+
+    @classmethod
+    def hash_file(cls, path: str) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def key_for(self, path: str) -> str:
+        # Always hashes the content, file metadata can't tell two uploads apart.
+        # Submissions are hashed once by validate_video and carry the key in their job record.
+        return await asyncio.to_thread(self.hash_file, path)
+
+    @staticmethod
+    def variant(ffmpeg_cmd: List[str], input_path: str, output_path: str) -> str:
+        """Identify an encode by its ffmpeg arguments, so changing any setting misses the cache"""
+        args = [arg for arg in ffmpeg_cmd if arg not in (input_path, output_path)]
+        return hashlib.blake2b(json.dumps(args).encode(), digest_size=8).hexdigest()
+
+    def _touch(self, key: str) -> dict:
+        self._load()
+        entry = self.entries.setdefault(key, {'outputs': {}})
+        entry['last_used'] = time.time()
+        return entry
+
+    def get_probe(self, key: str) -> Optional[dict]:
+        self._load()
+        if key in self.entries and 'probe' in self.entries[key]:
+            return self._touch(key)['probe']
+        return None
+
+    def put_probe(self, key: str, probe_data: dict):
+        self._touch(key)['probe'] = probe_data
+        self._evict()
+        self._save()
+
+    async def fetch_output(self, key: str, variant: str, destination: str) -> bool:
+        """Put the cached encode at destination, False on a miss"""
+        self._load()
+        output = self.entries.get(key, {}).get('outputs', {}).get(variant)
+        if not output:
+            return False
+        try:
+            await asyncio.to_thread(link_or_copy, os.path.join(self.directory, output['file']), destination)
+        except OSError as e:
+            print(f"❌ [CACHE] Could not reuse {output['file']}: {e}")
+            return False
+        output['last_used'] = self._touch(key)['last_used']
+        self._save()
+        return True
+
+    async def store_output(self, key: str, variant: str, path: str):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{key}-{variant}.mp4"
+        try:
+            await asyncio.to_thread(link_or_copy, path, os.path.join(self.directory, name))
+        except OSError as e:
+            print(f"❌ [CACHE] Could not store {name}: {e}")
+            return
+        self._touch(key)['outputs'][variant] = {'file': name, 'size': os.path.getsize(path), 'last_used': time.time()}
+        self._evict()
+        self._save()
+
+    def _evict(self):
+        outputs = sorted(
+            ((output['last_used'], key, variant, output) for key, entry in self.entries.items() for variant, output in entry['outputs'].items()),
+            key=lambda item: item[0]
+        )
+        total = sum(output['size'] for *_, output in outputs)
+        while outputs and (total > self.max_bytes or len(outputs) > self.max_entries):
+            _, key, variant, output = outputs.pop(0)
+            total -= output['size']
+            del self.entries[key]['outputs'][variant]
+            try:
+                os.remove(os.path.join(self.directory, output['file']))
+            except FileNotFoundError:
+                pass
+            print(f"🧹 [CACHE] Evicted {output['file']}")
+
+        # Probe-only entries are tiny, just cap their number
+        if len(self.entries) > self.max_entries:
+            for key in sorted(self.entries, key=lambda key: self.entries[key].get('last_used', 0)):
+                if len(self.entries) <= self.max_entries:
+                    break
+                if not self.entries[key]['outputs']:
+                    del self.entries[key]
+
+media_cache = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_MB, MEDIA_CACHE_MAX_ENTRIES)
+
+@functools.lru_cache(maxsize=None)
+def load_blur_profile(name: str = None) -> dict:
+    """Blur profile from BLUR_PROFILES_FILE. Region values are fractions of the frame height,
+    x is measured from the anchor (left edge, center or right edge) so HUDs keep their place on ultrawide."""
+    with open(BLUR_PROFILES_FILE, 'r') as f:
+        profiles = json.load(f)
+    return profiles[name or BLUR_PROFILE]
+
+def blur_output_size(width: int, height: int) -> tuple:
+    """Output size of a clip, downscaled to the profile's max height and always even (libx264 yuv420p
+    rejects odd sizes, an odd source just loses its last row/column). Raises UnsupportedResolutionError."""
+    profile = load_blur_profile()
+    min_aspect, max_aspect = profile['aspect_range']
+    if height < profile['min_height'] or not min_aspect <= width / height <= max_aspect:
+        raise UnsupportedResolutionError(width, height)
+    if height <= profile['max_output_height']:
+        return width - width % 2, height - height % 2
+    out_height = profile['max_output_height']
+    out_width = round(width * out_height / height / 2) * 2  # libx264 wants even dimensions
+    return out_width, out_height
+
+@functools.lru_cache(maxsize=64)
+def blur_regions(width: int, height: int) -> tuple:
+    """Pixel rectangles (name, x, y, width, height) of the profile on a frame of this size"""
+    anchors = {'left': 0, 'center': width / 2, 'right': width}
+    regions = []
+    for region in load_blur_profile()['regions']:
+        x = max(0, round(anchors[region['anchor']] + region['x'] * height))
+        y = max(0, round(region['y'] * height))
+        w = min(round(region['width'] * height), width - x)
+        h = min(round(region['height'] * height), height - y)
+        if w > 0 and h > 0:
+            regions.append((region['name'], x, y, w, h))
+    return tuple(regions)
+
+@functools.lru_cache(maxsize=64)
+def compile_video_filter(width: int, height: int, apply_blur: bool, engine: str = None) -> tuple:
+    """(filter_complex, output width, output height) for a source size, built once per resolution.
+    Clips above the profile's max height are scaled in the same graph before the blur."""
+    out_width, out_height = blur_output_size(width, height)
+    if out_height < height - 1 or out_width < width - 1:
+        scale = f"scale={out_width}:{out_height},"
+    elif (out_width, out_height) != (width, height):
+        # Odd source, drop the last row/column instead of resampling the whole frame
+        scale = f"crop={out_width}:{out_height}:0:0,"
+    else:
+        scale = ""
+    if not apply_blur:
+        return f"[0:v]{scale}format=yuv420p[vout]", out_width, out_height
+    return build_blur_filter(blur_regions(out_width, out_height), engine, scale), out_width, out_height
+
+def cluster_blur_regions(regions: list, gap: int = BLUR_CLUSTER_GAP) -> list:
+    """Group regions whose boxes are within gap px of each other, returns [(bbox, regions)]"""
+    clusters = []
+    for region in regions:
+        _, x, y, w, h = region
+        box = (x, y, x + w, y + h)
+        merged = [region]
+        # Absorb every existing cluster this box (grown by the previous merges) comes close to
+        for cluster in clusters[:]:
+            (cx0, cy0, cx1, cy1), members = cluster
+            if box[0] - gap <= cx1 and cx0 - gap <= box[2] and box[1] - gap <= cy1 and cy0 - gap <= box[3]:
+                box = (min(box[0], cx0), min(box[1], cy0), max(box[2], cx1), max(box[3], cy1))
+                merged = members + merged
+                clusters.remove(cluster)
+        clusters.append((box, merged))
+    return [((x0, y0, x1 - x0, y1 - y0), members) for (x0, y0, x1, y1), members in clusters]
+
+def build_legacy_blur_filter(regions: list, pre: str = "") -> str:
+    """Original graph: split the frame per region, blur each crop and chain one overlay per region"""
+    count = len(regions)
+    graph = [f"[0:v]{pre}split={count + 1}[main]" + "".join(f"[crop{i}]" for i in range(count))]
+    for i, (_, x, y, w, h) in enumerate(regions):
+        graph.append(f"[crop{i}]crop={w}:{h}:{x}:{y},{BLUR_FILTER}[blur{i}]")
+    previous = "main"
+    for i, (_, x, y, w, h) in enumerate(regions):
+        output = "vout" if i == count - 1 else f"tmp{i}"
+        graph.append(f"[{previous}][blur{i}]overlay={x}:{y}[{output}]")
+        previous = output
+    return ";".join(graph)
+
+def build_masked_blur_filter(regions: list, pre: str = "") -> str:
+    """One crop, blur and overlay per cluster of regions. A static one-frame mask, repeated by
+    maskedmerge, keeps the blur inside the region rectangles so pixels outside them are untouched.
+    Not pixel-identical to the legacy graph inside them: the whole cluster box is blurred at once, so
+    pixels near a region edge also average their neighbours outside it, and overlapping regions are
+    blurred once instead of once per region."""
+    clusters = cluster_blur_regions(regions)
+    graph = [f"[0:v]{pre}format=yuv420p,split={len(clusters) + 1}[main]" + "".join(f"[crop{i}]" for i in range(len(clusters)))]
+    previous = "main"
+    for i, ((bx, by, bw, bh), members) in enumerate(clusters):
+        # Keep the crop on even coordinates so yuv420p chroma isn't shifted by the overlay
+        bw, bh = bw + bx % 2, bh + by % 2
+        bx, by = bx - bx % 2, by - by % 2
+        bw, bh = bw + bw % 2, bh + bh % 2
+        # Mask is 255 inside any member rectangle, X/SW and Y/SH give luma coordinates on every plane
+        inside = "+".join(
+            f"between(X/SW,{x - bx},{x - bx + w - 1})*between(Y/SH,{y - by},{y - by + h - 1})"
+            for _, x, y, w, h in members
+        )
+        mask = f"255*gt({inside},0)"
+        graph.append(f"[crop{i}]crop={bw}:{bh}:{bx}:{by},split=2[orig{i}][soft{i}]")
+        graph.append(f"[soft{i}]{BLUR_FILTER}[blur{i}]")
+        graph.append(f"color=c=black:s={bw}x{bh}:r=1:d=1,format=yuv420p,geq=lum='{mask}':cb='{mask}':cr='{mask}'[mask{i}]")
+        graph.append(f"[orig{i}][blur{i}][mask{i}]maskedmerge[merged{i}]")
+        output = "vout" if i == len(clusters) - 1 else f"tmp{i}"
+        graph.append(f"[{previous}][merged{i}]overlay={bx}:{by}[{output}]")
+        previous = output
+    return ";".join(graph)
+
+def build_blur_filter(regions: list, engine: str = None, pre: str = "") -> str:
+    """Blur graph reading [0:v] and writing [vout], pre is a filter chain run first (e.g. a scale)"""
+    engine = engine or BLUR_ENGINE
+    if engine == 'legacy':
+        return build_legacy_blur_filter(regions, pre)
+    return build_masked_blur_filter(regions, pre)
+
+async def benchmark_blur(paths: List[str]):
+    """Run each clip through both blur engines, graph only and with the production encode,
+    and report fps and ffmpeg's peak RSS"""
+    for path in paths:
+        probe_data = await probe_video(path)
+        video_stream = next(s for s in probe_data['streams'] if s['codec_type'] == 'video')
+        width = int(video_stream['width'])
+        height = int(video_stream['height'])
+        print(f"🎬 [BENCHMARK] {path} ({width}x{height})")
+
+        runs = [
+            (engine, mode, codec_args)
+            for mode, codec_args in (('graph', []), ('encode', ['-c:v', 'libx264', '-preset', 'fast']))
+            for engine in ('legacy', 'masked')
+        ]
+        for engine, mode, codec_args in runs:
+            cmd = [
+                'ffmpeg', '-y', '-v', 'error', '-progress', 'pipe:1', '-threads', str(transcode_pool.threads), '-i', path,
+                '-filter_complex', compile_video_filter(width, height, True, engine)[0], '-map', '[vout]',
+                *codec_args, '-threads', str(transcode_pool.threads), '-f', 'null', '-'
+            ]
+            started = time.time()
+            proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            peak_rss = 0
+            frames = 0
+            try:
+                ffmpeg_process = psutil.Process(proc.pid)
+                while True:
+                    try:
+                        line = await asyncio.wait_for(proc.stdout.readline(), timeout=0.1)
+                    except asyncio.TimeoutError:
+                        line = None
+                    if line == b'':
+                        break
+                    if line and line.startswith(b'frame='):
+                        frames = int(line.split(b'=')[1])
+                    try:
+                        peak_rss = max(peak_rss, ffmpeg_process.memory_info().rss)
+                    except psutil.Error:
+                        pass
+            finally:
+                _, stderr = await proc.communicate()
+            elapsed = time.time() - started
+            if proc.returncode != 0:
+                print(f"    ❌ {engine} {mode}: ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+                continue
+            print(f"    {engine:>7} {mode:>6}: {frames / elapsed:6.1f} fps, {elapsed:6.1f}s, peak RSS {peak_rss / (1024 * 1024):.0f}MB")
+
+async def check_blur_equivalence(paths: List[str], tolerance: int = BLUR_EQUIVALENCE_TOLERANCE) -> bool:
+    """Decode each clip through both blur engines side by side and compare the luma frame by frame.
+    Returns False when the masked engine differs from legacy by more than tolerance anywhere."""
+    equivalent = True
+    for path in paths:
+        probe_data = await probe_video(path)
+        video_stream = next(s for s in probe_data['streams'] if s['codec_type'] == 'video')
+        width = int(video_stream['width'])
+        height = int(video_stream['height'])
+        _, out_width, out_height = compile_video_filter(width, height, True, 'legacy')
+        frame_size = out_width * out_height
+
+        procs = []
+        for engine in ('legacy', 'masked'):
+            cmd = [
+                'ffmpeg', '-v', 'error', '-i', path, '-filter_complex', compile_video_filter(width, height, True, engine)[0],
+                '-map', '[vout]', '-f', 'rawvideo', '-pix_fmt', 'gray', '-'
+            ]
+            procs.append(await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL))
+
+        frames = 0
+        max_diff = 0
+        over = 0
+        try:
+            while True:
+                try:
+                    # One frame at a time from each engine, memory stays at two frames whatever the clip length
+                    legacy_frame, masked_frame = [
+                        np.frombuffer(await proc.stdout.readexactly(frame_size), dtype=np.uint8) for proc in procs
+                    ]
+                except asyncio.IncompleteReadError:
+                    break
+                diff = np.abs(legacy_frame.astype(np.int16) - masked_frame)
+                max_diff = max(max_diff, int(diff.max()))
+                over += int(np.count_nonzero(diff > tolerance))
+                frames += 1
+        finally:
+            for proc in procs:
+                if proc.returncode is None:
+                    proc.kill()
+                await proc.wait()
+
+        if frames == 0:
+            print(f"❌ [CHECK BLUR] {path}: no frames decoded")
+            equivalent = False
+            continue
+        status = "✅" if max_diff <= tolerance else "❌"
+        equivalent = equivalent and max_diff <= tolerance
+        print(f"{status} [CHECK BLUR] {path} ({out_width}x{out_height}, {frames} frames): max luma difference {max_diff}, "
+              f"{over} pixel(s) over {tolerance} ({over / (frames * frame_size) * 100:.4f}%)")
+    return equivalent
+
+class MemcheckChannel:
+    """Stand-in for the guess channel of --memcheck-approval, send() posts the file as multipart
+    like discord.py does, to the local file server, and returns the hosted URL"""
+
+    def __init__(self, api_url: str):
+        self.api_url = api_url
+
+    async def send(self, file: discord.File = None, **kwargs) -> str:
+        data = aiohttp.FormData()
+        data.add_field('reqtype', 'fileupload')
+        data.add_field('fileToUpload', file.fp, filename=file.filename, content_type='video/mp4')
+        async with http.session.post(self.api_url, data=data) as response:
+            return (await response.text()).strip()
+
+async def memcheck_approval(size_mb: int) -> bool:
+    """Push a synthetic clip of size_mb through save_video_from_attachment and repost_attachment (the submission
+    download and the approval re-post) against the local file server, and check that peak RSS stays flat.
+    Returns False when it grew more than MEMCHECK_MAX_GROWTH_MB."""
+    work_dir = tempfile.mkdtemp(prefix='memcheck-')
+    server = LocalHosting(work_dir, '127.0.0.1', LOCAL_HOSTING_PORT, f"http://127.0.0.1:{LOCAL_HOSTING_PORT}")
+    process = psutil.Process()
+    peak_rss = 0
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, process.memory_info().rss)
+            await asyncio.sleep(0.005)
+
+    try:
+        clip_path = os.path.join(work_dir, 'synthetic.mp4')
+        with open(clip_path, 'wb') as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        await server.start()
+        http.open()
+        # Only the filename and url of an attachment are used by both paths
+        attachment = types.SimpleNamespace(filename='synthetic.mp4', url=server.files_url + 'synthetic.mp4')
+
+        gc.collect()
+        baseline_rss = process.memory_info().rss
+        peak_rss = baseline_rss
+        sampler = asyncio.create_task(sample_rss())
+        started = time.time()
+        try:
+            downloaded_path = await save_video_from_attachment(attachment)
+            reposted_url = await repost_attachment(attachment, MemcheckChannel(server.api_url))
+        finally:
+            sampler.cancel()
+            await asyncio.gather(sampler, return_exceptions=True)
+        elapsed = time.time() - started
+
+        received = os.path.getsize(downloaded_path) if downloaded_path else 0
+        cleanup_files([downloaded_path] if downloaded_path else [])
+        reposted_size = os.path.getsize(os.path.join(work_dir, os.path.basename(reposted_url)))
+        growth_mb = (peak_rss - baseline_rss) / (1024 * 1024)
+        ok = received == reposted_size == size_mb * 1024 * 1024 and growth_mb <= MEMCHECK_MAX_GROWTH_MB
+        print(f"{'✅' if ok else '❌'} [MEMCHECK] {size_mb}MB clip moved 3 times in {elapsed:.1f}s, "
+              f"peak RSS +{growth_mb:.1f}MB (limit {MEMCHECK_MAX_GROWTH_MB}MB), re-uploaded {reposted_size / (1024 * 1024):.0f}MB")
+        return ok
+    finally:
+        await server.close()
+        await http.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+# ffprobe, two decodes and a hash per check, a burst of DMs must not start them all at once
+validation_slots = asyncio.Semaphore(PIPELINE_VALIDATE_WORKERS)
+
+async def validate_video(path: str) -> str:
+    """Check a submission right after download so bad files never wait in the queue.
+    Raises UnsupportedResolutionError or InvalidVideoError, returns the content key the probe is cached under.
+    At most PIPELINE_VALIDATE_WORKERS checks run at once, downloads and the pipeline's validate stage share them."""
+    async with validation_slots:
+        return await check_video_file(path)
+
+async def check_video_file(path: str) -> str:
+    try:
+        probe_data = await probe_video(path)
+    except Exception:
+        raise InvalidVideoError("This file couldn't be read, it may be corrupted or not a video.")
+
+    video_stream = next((s for s in probe_data.get('streams', []) if s.get('codec_type') == 'video'), None)
+    if not video_stream or not video_stream.get('width') or not video_stream.get('height'):
+        raise InvalidVideoError("No video stream found in this file.")
+    if video_stream.get('codec_name') in (None, 'none', 'unknown'):
+        raise InvalidVideoError("The video codec of this file isn't supported.")
+
+    try:
+        duration = float(probe_data['format']['duration'])
+    except (KeyError, ValueError):
+        raise InvalidVideoError("This file has no readable duration, it may be corrupted.")
+    if duration < MIN_VIDEO_DURATION:
+        raise InvalidVideoError(f"Clip is too short ({duration:.1f}s), send at least {MIN_VIDEO_DURATION}s.")
+    if duration > MAX_VIDEO_DURATION:
+        raise InvalidVideoError(f"Clip is too long ({duration / 60:.1f}min), the limit is {MAX_VIDEO_DURATION // 60}min.")
+
+    # Raises UnsupportedResolutionError
+    blur_output_size(int(video_stream['width']), int(video_stream['height']))
+
+    # Decode one frame at the start and one near the end, catches truncated uploads and broken streams
+    for seek in (0, max(0, duration - 1)):
+        proc = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-v', 'error', '-ss', f'{seek:.2f}', '-i', path, '-map', '0:v:0', '-frames:v', '1', '-f', 'null', '-',
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            print(f"❌ [VALIDATE] Decode test failed at {seek:.1f}s: {stderr.decode(errors='replace').strip()[-300:]}")
+            raise InvalidVideoError("This video couldn't be decoded, the upload may be incomplete or corrupted.")
+
+    # The encoder will find this probe in the cache instead of running ffprobe again
+    content_key = await media_cache.key_for(path)
+    media_cache.put_probe(content_key, probe_data)
+    return content_key
+
+# Rough output size of each x264 preset relative to 'fast' at the same CRF
+PRESET_SIZE_FACTORS = {'ultrafast': 1.6, 'veryfast': 1.1, 'fast': 1.0}
+
+async def sample_complexity(input_path: str, duration: float, out_width: int, out_height: int, threads: int) -> Optional[float]:
+    """kbps an ultrafast CRF 23 encode needs on a few seconds from the middle of the clip, None if it failed"""
+    length = min(ENCODE_SAMPLE_SECONDS, duration)
+    if length < 0.5:
+        return None
+    start = max(0, duration / 2 - length / 2)
+    cmd = [
+        'ffmpeg', '-v', 'error', '-ss', f'{start:.2f}', '-t', f'{length:.2f}', '-i', input_path,
+        '-an', '-vf', f'scale={out_width}:{out_height}', '-c:v', 'libx264', '-preset', 'ultrafast',
+        '-crf', '23', '-threads', str(threads), '-f', 'h264', '-'
+    ]
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    encoded_bytes = 0
+    try:
+        # Only the byte count matters, the bitstream itself is thrown away
+        while chunk := await proc.stdout.read(64 * 1024):
+            encoded_bytes += len(chunk)
+        await proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if proc.returncode != 0 or not encoded_bytes:
+        return None
+    return encoded_bytes * 8 / 1000 / length
+
+def remux_blockers(probe_data: dict, target_size_mb: int, out_size: tuple) -> List[str]:
+    """Reasons a clip can't simply be remuxed, empty when its video stream can be copied as is"""
+    video_stream = next(s for s in probe_data['streams'] if s['codec_type'] == 'video')
+    file_size_mb = int(probe_data['format'].get('size', 0)) / (1024 * 1024)
+    blockers = []
+    if video_stream.get('codec_name') != 'h264':
+        blockers.append(f"codec {video_stream.get('codec_name')}")
+    # 8-bit 4:2:0 is the only H.264 flavour every Discord client and browser plays
+    if video_stream.get('pix_fmt') not in ('yuv420p', 'yuvj420p'):
+        blockers.append(f"pixel format {video_stream.get('pix_fmt')}")
+    if out_size != (int(video_stream['width']), int(video_stream['height'])):
+        blockers.append("needs resize")
+    if not 0 < file_size_mb <= target_size_mb:
+        blockers.append(f"{file_size_mb:.1f}MB over target")
+    return blockers
+
+def plan_encode(probe_data: dict, target_size_mb: int, apply_blur: bool, out_size: tuple, sample_kbps: Optional[float] = None) -> dict:
+    """Choose between a stream copy and a libx264 encode, and its preset, CRF and maxrate, to land
+    under target_size_mb in a single pass with as little CPU as the clip allows"""
+    duration = float(probe_data['format']['duration'])
+
+    # Nothing to change: keep the original bitstream, only move the moov atom up front
+    if not apply_blur:
+        blockers = remux_blockers(probe_data, target_size_mb, out_size)
+        if not blockers:
+            return {'mode': 'copy', 'reason': f"compliant H.264 already under {target_size_mb}MB"}
+        print(f"    🔁 [ENCODING] Remux not possible: {', '.join(blockers)}")
+
+    # Output is video only, keep ~3% for the mp4 container
+    budget_kbps = int(target_size_mb * 8192 * 0.97 / duration)
+    floor_kbps = ENCODE_MIN_VIDEO_KBPS[1080 if out_size[1] >= 1080 else 720]
+    maxrate_kbps = max(budget_kbps, floor_kbps)
+
+    if not sample_kbps:
+        # No sample, fall back to the fixed settings of the old encoder
+        crf = 22 if out_size[1] >= 1080 else 23
+        return {'mode': 'encode', 'preset': 'fast', 'crf': crf, 'maxrate_kbps': maxrate_kbps, 'bufsize_kbps': maxrate_kbps * 2,
+                'reason': "no complexity sample, default settings"}
+
+    # Easy content or long clips don't need the slower preset to fit
+    fast_kbps_at_23 = sample_kbps / PRESET_SIZE_FACTORS['ultrafast']
+    headroom = budget_kbps / fast_kbps_at_23
+    preset = 'veryfast' if headroom >= 1.5 or duration > 180 else 'fast'
+    crf23_kbps = fast_kbps_at_23 * PRESET_SIZE_FACTORS[preset]
+
+    # x264 bitrate roughly halves every +6 CRF
+    crf = round(23 - 6 * math.log2(budget_kbps / crf23_kbps)) if budget_kbps > 0 else ENCODE_CRF_RANGE[1]
+    crf = max(ENCODE_CRF_RANGE[0], min(crf, ENCODE_CRF_RANGE[1]))
+    return {'mode': 'encode', 'preset': preset, 'crf': crf, 'maxrate_kbps': maxrate_kbps, 'bufsize_kbps': maxrate_kbps * 2,
+            'reason': f"sample {sample_kbps:.0f}kbps, budget {budget_kbps}kbps"}
+
+async def encode_segments(ffmpeg_cmd: List[str], input_path: str, output_path: str, duration: float, parallel: int, on_progress=None) -> Optional[tuple]:
+    """Split the input at keyframes, run ffmpeg_cmd on every piece with parallel processes and concat
+    the results without re-encoding. Returns run_ffmpeg's (returncode, log lines), None if the clip
+    couldn't be split (too few keyframes) so the caller can encode it in one process."""
+    work_dir = tempfile.mkdtemp(prefix='gmr-segments-')
+    try:
+        # Stream copy split, cuts can only land on keyframes
+        segment_time = duration / parallel
+        split_cmd = [
+            'ffmpeg', '-y', '-v', 'error', '-i', input_path, '-map', '0:v:0', '-c', 'copy',
+            '-f', 'segment', '-segment_time', f'{segment_time:.2f}', '-reset_timestamps', '1',
+            os.path.join(work_dir, 'part%03d.mkv')
+        ]
+        proc = await asyncio.create_subprocess_exec(*split_cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+        _, stderr = await proc.communicate()
+        parts = sorted(name for name in os.listdir(work_dir) if name.startswith('part'))
+        if proc.returncode != 0 or len(parts) < 2:
+            print(f"    🧩 [SEGMENTS] Could not split the clip ({len(parts)} part(s)), encoding in one process")
+            return None
+        print(f"    🧩 [SEGMENTS] Encoding {len(parts)} segments with {parallel} processes")
+
+        # Overall progress is the average of the segments' progress
+        progress = [0.0] * len(parts)
+        started = time.time()
+        last_report = [0.0]
+        async def segment_progress(index: int, percent: float):
+            progress[index] = percent
+            # Every segment reports on its own, keep one user-facing update per interval
+            if on_progress and time.time() - last_report[0] >= FFMPEG_PROGRESS_INTERVAL:
+                last_report[0] = time.time()
+                total = sum(progress) / len(progress)
+                elapsed = time.time() - started
+                await on_progress(total, 0, elapsed * (100 - total) / total if total > 0 else None)
+
+        semaphore = asyncio.Semaphore(parallel)
+        async def encode_part(index: int, part: str):
+            part_output = os.path.join(work_dir, f"encoded{index:03d}.mp4")
+            cmd = [
+                os.path.join(work_dir, part) if arg == input_path else part_output if arg == output_path else arg
+                for arg in ffmpeg_cmd
+            ]
+            async with semaphore:
+                result = await run_ffmpeg(
+                    cmd, segment_time,
+                    lambda percent, fps, eta: segment_progress(index, percent)
+                )
+            return result, part_output
+
+        results = await asyncio.gather(*(encode_part(i, part) for i, part in enumerate(parts)))
+        for (returncode, log_tail), _ in results:
+            if returncode != 0:
+                return returncode, log_tail
+
+        # Lossless join, every piece was encoded with the same settings
+        list_path = os.path.join(work_dir, 'parts.txt')
+        with open(list_path, 'w') as f:
+            for _, part_output in results:
+                f.write(f"file '{part_output}'\n")
+        concat_cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', '-movflags', '+faststart', output_path]
+        return await run_ffmpeg(concat_cmd, duration)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+async def blur_video(input_path: str, target_size_mb: int = 25, apply_blur: bool = True, threads: int = None, on_progress=None, content_key: str = None) -> str:
+    """Apply adaptive blur and compress video using FFmpeg with optimized quality for Catbox.
+    content_key is the hash validate_video computed, the file is hashed here when it is missing."""
     log_memory_usage("Video processing start")
+    threads = threads or transcode_pool.threads
     
     # Create temporary output file
     output_fd, output_path = tempfile.mkstemp(suffix='.mp4')
     os.close(output_fd)
+    completed = False
 
     try:
-        # FFprobe to get video info
-        probe_cmd = [
-            'ffprobe', '-v', 'quiet', '-print_format', 'json',
-            '-show_format', '-show_streams', input_path
-        ]
-        probe_proc = await asyncio.create_subprocess_exec(
-            *probe_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await probe_proc.communicate()
-        if probe_proc.returncode != 0:
-            raise Exception(f"FFprobe failed: {stderr.decode()}")
-
-        probe_data = json.loads(stdout.decode())
-        print(f"🔍 [FFPROBE] Video analysis completed")
+        # FFprobe to get video info, unless this exact content was seen before
+        cache_key = content_key or await media_cache.key_for(input_path)
+        probe_data = media_cache.get_probe(cache_key)
+        if probe_data is None:
+            probe_data = await probe_video(input_path)
+            media_cache.put_probe(cache_key, probe_data)
+            print(f"🔍 [FFPROBE] Video analysis completed")
+        else:
+            print(f"♻️ [CACHE] Probe data reused for {cache_key[:12]}")
 
         # Extract resolution and duration
         video_stream = next((s for s in probe_data['streams'] if s['codec_type'] == 'video'), None)
@@ -1751,14 +3874,15 @@ async def blur_video(input_path: str, target_size_mb: int = 25, apply_blur: bool
         # Get original bitrate for reference
         original_bitrate = int(probe_data['format'].get('bit_rate', 0)) // 1000  # Convert to kbps
         
-        supported_resolutions = [(1920, 1080), (1280, 720)]
-        if (width, height) not in supported_resolutions:
+        try:
+            filter_complex, out_width, out_height = compile_video_filter(width, height, apply_blur)
+        except UnsupportedResolutionError:
             print(f"❌ [RESOLUTION] Unsupported resolution: {width}x{height}")
-            print(f"    Supported resolutions: 1920x1080 (1080p), 1280x720 (720p)")
-            raise UnsupportedResolutionError(width, height)
+            print(f"    Supported: landscape clips of at least 720p (4:3 up to 32:9)")
+            raise
         
         blur_status = "with blur" if apply_blur else "compression only"
-        print(f"📐 [VIDEO_INFO] Resolution: {width}x{height}, Duration: {duration:.1f}s")
+        print(f"📐 [VIDEO_INFO] Resolution: {width}x{height} -> {out_width}x{out_height}, Duration: {duration:.1f}s")
         print(f"📊 [VIDEO_INFO] Original bitrate: {original_bitrate}kbps")
         print(f"🎨 [PROCESSING] Mode: {blur_status}")
 
@@ -1766,119 +3890,91 @@ async def blur_video(input_path: str, target_size_mb: int = 25, apply_blur: bool
         gc.collect()
         log_memory_usage("Before FFmpeg processing")
 
-        # Compute target bitrate - more generous since we're using Catbox
-        target_bitrate_kbps = int((target_size_mb * 8192) / duration)
-        
-        # Set better quality ranges based on resolution
-        if width == 1920 and height == 1080:  # 1080p
-            min_bitrate = 1500  # Increased from 400
-            max_bitrate = 8000  # Increased from 4000
-            target_crf = 22     # Better quality (lower CRF)
-        else:  # 720p
-            min_bitrate = 1000  # Increased from 300
-            max_bitrate = 6000  # Increased from 3000
-            target_crf = 23     # Better quality for 720p
-        
-        # Clamp the target bitrate to reasonable bounds
-        target_bitrate_kbps = max(min_bitrate, min(target_bitrate_kbps, max_bitrate))
-        
-        print(f"🎯 [ENCODING] Target bitrate: {target_bitrate_kbps}kbps (range: {min_bitrate}-{max_bitrate})")
-        print(f"🎯 [ENCODING] Target CRF: {target_crf}")
+        # Complexity sample, stored with the probe data so a resubmission doesn't pay for it again
+        sample_key = f"{out_width}x{out_height}"
+        sample_kbps = probe_data.setdefault('sample_kbps', {}).get(sample_key)
+        plan = plan_encode(probe_data, target_size_mb, apply_blur, (out_width, out_height), sample_kbps)
+        if plan['mode'] == 'encode' and sample_kbps is None:
+            sample_kbps = await sample_complexity(input_path, duration, out_width, out_height, threads)
+            if sample_kbps:
+                probe_data['sample_kbps'][sample_key] = sample_kbps
+                media_cache.put_probe(cache_key, probe_data)
+                plan = plan_encode(probe_data, target_size_mb, apply_blur, (out_width, out_height), sample_kbps)
+        print(f"🎯 [ENCODING] Plan: {plan['mode']} ({plan['reason']})")
 
         # Build base FFmpeg command with better quality settings
         ffmpeg_cmd = ['ffmpeg', '-y', '-i', input_path]
 
-        # Conditional blur based on user choice and resolution
-        if apply_blur and ((width == 1920 and height == 1080) or (width == 1280 and height == 720)):
-            # Scale factor for 720p (2/3 of 1080p values)
-            scale = 2/3 if width == 1280 else 1
-            
-            print(f"🎨 [BLUR] Applying blur with scale factor: {scale}")
-            
-            # Blur parameters (1080p base values, scaled for 720p)
-            left_blur_x = int(0 * scale)
-            left_blur_y = int(90 * scale)
-            left_blur_width = int(428 * scale)
-            left_blur_height = int(318 * scale)
-
-            bottom_blur_width = int(293 * scale)
-            bottom_blur_height = int(28 * scale)
-            bottom_blur_x = int(764 * scale)
-            bottom_blur_y = int(1032 * scale)
-
-            voice_chat_width = int(198 * scale)
-            voice_chat_height = int(502 * scale)
-            voice_chat_x = int(38 * scale)
-            voice_chat_y = int(357 * scale)
-
-            text_chat_width = int(425 * scale)
-            text_chat_height = int(168 * scale)
-            text_chat_x = int(25 * scale)
-            text_chat_y = int(695 * scale)
-
-            replay_name_x = int(730 * scale)
-            replay_name_y = int(1043 * scale)
-            replay_name_width = int(241 * scale)
-            replay_name_height = int(25 * scale)
-
-            # Filter complex for blur
-            filter_complex = (
-                f"[0:v]split=6[main][left_crop][bottom_crop][voice_crop][text_crop][replay_crop];"
-                f"[left_crop]crop={left_blur_width}:{left_blur_height}:{left_blur_x}:{left_blur_y},boxblur=lr=8:cr=4[left_blur];"
-                f"[bottom_crop]crop={bottom_blur_width}:{bottom_blur_height}:{bottom_blur_x}:{bottom_blur_y},boxblur=lr=8:cr=4[bottom_blur];"
-                f"[voice_crop]crop={voice_chat_width}:{voice_chat_height}:{voice_chat_x}:{voice_chat_y},boxblur=lr=8:cr=4[voice_blur];"
-                f"[text_crop]crop={text_chat_width}:{text_chat_height}:{text_chat_x}:{text_chat_y},boxblur=lr=8:cr=4[text_blur];"
-                f"[replay_crop]crop={replay_name_width}:{replay_name_height}:{replay_name_x}:{replay_name_y},boxblur=lr=8:cr=4[replay_blur];"
-                f"[main][left_blur]overlay={left_blur_x}:{left_blur_y}[tmp1];"
-                f"[tmp1][bottom_blur]overlay={bottom_blur_x}:{bottom_blur_y}[tmp2];"
-                f"[tmp2][voice_blur]overlay={voice_chat_x}:{voice_chat_y}[tmp3];"
-                f"[tmp3][replay_blur]overlay={replay_name_x}:{replay_name_y}[tmp4];"
-                f"[tmp4][text_blur]overlay={text_chat_x}:{text_chat_y}[vout]"
-            )
-
-            ffmpeg_cmd += ['-filter_complex', filter_complex, '-map', '[vout]']
+        if plan['mode'] == 'copy':
+            print(f"🎨 [BLUR] Skipping blur as requested by user")
+            ffmpeg_cmd += [
+                '-map', '0:v:0',                # Video only, like the encoded outputs
+                '-c:v', 'copy',
+                '-movflags', '+faststart',      # Playable while it downloads
+                output_path
+            ]
         else:
-            if not apply_blur:
-                print(f"🎨 [BLUR] Skipping blur as requested by user")
+            print(f"🎯 [ENCODING] Preset: {plan['preset']}, CRF: {plan['crf']}, maxrate: {plan['maxrate_kbps']}kbps")
+
+            # Blur regions (and the downscale of clips above 1080p) come precompiled for this resolution
+            if apply_blur:
+                print(f"🎨 [BLUR] Applying '{BLUR_PROFILE}' blur profile ({BLUR_ENGINE} engine)")
             else:
-                print(f"🎨 [BLUR] No blur applied - unsupported resolution")
-            ffmpeg_cmd += ['-map', '0:v']
-
-        # Better encoding settings for Catbox upload
-        ffmpeg_cmd += [
-            '-c:v', 'libx264',
-            '-preset', 'fast',              # Still fast for VPS but better quality than ultrafast
-            '-crf', str(target_crf),        # Lower CRF = better quality
-            '-maxrate', f'{target_bitrate_kbps}k',
-            '-bufsize', f'{target_bitrate_kbps * 2}k',  # Larger buffer for better quality
-            '-c:a', 'aac',
-            '-b:a', '128k',                 # Increased audio bitrate from 96k
-            '-ac', '2',                     # Ensure stereo audio
-            '-ar', '44100',                 # Standard audio sample rate
-            '-pix_fmt', 'yuv420p',
-            '-movflags', '+faststart',
-            '-profile:v', 'high',           # H.264 High Profile for better compression
-            '-level:v', '4.1',              # Compatibility level
-            '-threads', '2',                # Use 2 threads (slightly more than before)
-            '-g', '50',                     # GOP size for better seeking
-            output_path
-        ]
+                print(f"🎨 [BLUR] Skipping blur as requested by user")
+            ffmpeg_cmd += ['-filter_complex', filter_complex, '-map', '[vout]']
+
+            # Better encoding settings for Catbox upload
+            ffmpeg_cmd += [
+                '-c:v', 'libx264',
+                '-preset', plan['preset'],      # Picked by plan_encode from the clip's complexity
+                '-crf', str(plan['crf']),       # Lower CRF = better quality
+                '-maxrate', f"{plan['maxrate_kbps']}k",
+                '-bufsize', f"{plan['bufsize_kbps']}k",
+                '-c:a', 'aac',
+                '-b:a', '128k',                 # Increased audio bitrate from 96k
+                '-ac', '2',                     # Ensure stereo audio
+                '-ar', '44100',                 # Standard audio sample rate
+                '-pix_fmt', 'yuv420p',
+                '-movflags', '+faststart',
+                '-profile:v', 'high',           # H.264 High Profile for better compression
+                '-level:v', '4.1',              # Compatibility level
+                '-threads', str(threads),       # Per-job share of the cores, see TranscodePool
+                '-g', '50',                     # GOP size for better seeking
+                output_path
+            ]
+
+        # Same content already encoded with the same settings (resubmission, failed upload...): skip ffmpeg
+        variant = media_cache.variant(ffmpeg_cmd, input_path, output_path)
+        if await media_cache.fetch_output(cache_key, variant, output_path):
+            print(f"♻️ [CACHE] Reusing encoded output {cache_key[:12]}-{variant}, transcode skipped")
+            completed = True
+            return output_path
 
-        processing_mode = "enhanced encoding with blur" if apply_blur else "compression-only encoding"
+        if plan['mode'] == 'copy':
+            processing_mode = "stream copy"
+        else:
+            processing_mode = "enhanced encoding with blur" if apply_blur else "compression-only encoding"
         print(f"🚀 [FFMPEG] Starting {processing_mode}...")
-        print(f"    📐 Settings: CRF={target_crf}, Bitrate={target_bitrate_kbps}k, Audio=128k")
         
-        # Execute FFmpeg with progress monitoring
-        proc = await asyncio.create_subprocess_exec(
-            *ffmpeg_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        _, stderr = await proc.communicate()
+        # Execute FFmpeg with progress monitoring, long clips can use the idle transcode slots
+        result = None
+        if plan['mode'] == 'encode' and SEGMENT_PARALLEL and duration >= SEGMENT_MIN_DURATION:
+            extra_slots = transcode_pool.try_reserve(SEGMENT_MAX_PARALLEL - 1)
+            if extra_slots:
+                try:
+                    result = await encode_segments(ffmpeg_cmd, input_path, output_path, duration, extra_slots + 1, on_progress)
+                finally:
+                    await transcode_pool.release(extra_slots)
+            else:
+                print(f"    🧩 [SEGMENTS] Transcode pool busy, encoding in one process")
+        if result is None:
+            result = await run_ffmpeg(ffmpeg_cmd, duration, on_progress)
+        returncode, log_tail = result
         
-        if proc.returncode != 0:
-            print(f"❌ [FFMPEG] Encoding failed: {stderr.decode()}")
-            raise Exception(f"FFmpeg failed: {stderr.decode()}")
+        if returncode != 0:
+            log_text = "\n".join(log_tail)
+            print(f"❌ [FFMPEG] Encoding failed: {log_text}")
+            raise Exception(f"FFmpeg failed: {log_text}")
 
         final_size = os.path.getsize(output_path) / (1024 * 1024)
         
@@ -1887,27 +3983,31 @@ async def blur_video(input_path: str, target_size_mb: int = 25, apply_blur: bool
         
         print(f"✅ [FFMPEG] Encoding completed successfully!")
         print(f"    📦 Output size: {final_size:.2f}MB (target: {target_size_mb}MB)")
-        print(f"    📊 Final bitrate: {final_bitrate}kbps (target: {target_bitrate_kbps}kbps)")
-        print(f"    🎵 Audio: 128kbps AAC stereo")
+        print(f"    📊 Final bitrate: {final_bitrate}kbps")
         print(f"    🎨 Blur: {'Applied' if apply_blur else 'Skipped'}")
         
         # Quality assessment
         if final_size <= target_size_mb * 1.1:  # Within 10% of target
             print(f"    ✅ Size target achieved!")
         else:
-            print(f"    ⚠️ Size slightly over target (acceptable for Catbox)")
+            print(f"    ⚠️ Size over target (acceptable for Catbox)")
+        
+        await media_cache.store_output(cache_key, variant, output_path)
         
         # Force garbage collection after processing
         gc.collect()
         log_memory_usage("After FFmpeg processing")
         
+        completed = True
         return output_path
 
     except Exception as e:
-        if os.path.exists(output_path):
-            os.remove(output_path)
         print(f"❌ [VIDEO_PROCESSING] Error: {e}")
         raise e
+    finally:
+        # Also runs when the job is cancelled (timeout, shutdown), which skips the except above
+        if not completed:
+            cleanup_files([output_path])
 
 @bot.event
 async def on_ready():
@@ -1919,104 +4019,44 @@ async def on_ready():
     memory = psutil.virtual_memory()
     print(f"💻 [SYSTEM] CPU cores: {cpu_count}, RAM: {memory.total / (1024**3):.1f}GB")
     print(f"📊 [SYSTEM] Available RAM: {memory.available / (1024**2):.0f}MB")
+    print(f"⚙️ [TRANSCODE] {transcode_pool.workers} worker(s), {transcode_pool.threads} ffmpeg thread(s) each")
     await tree.sync()
     print(f'Servers: {len(bot.guilds)}')
     
     # Load clip data if not already loaded
     if not hasattr(bot, 'pending_clips'):
-        if os.path.exists(CLIP_DATA_FILE):
-            with open(CLIP_DATA_FILE, 'r') as f:
-                data = json.load(f)
-                bot.pending_clips = {}
-                # Convert string keys to int for guild IDs, handle migration
-                for key, value in data.items():
-                    try:
-                        guild_id = int(key)
-                        if isinstance(value, dict):
-                            # Check if this is a server container or individual clip
-                            if any(isinstance(v, dict) and 'rank' in v for v in value.values()):
-                                # This is a proper server container
-                                bot.pending_clips[guild_id] = value
-                            else:
-                                # This might be an individual clip
-                                bot.pending_clips[guild_id] = {key: value}
-                        else:
-                            bot.pending_clips[guild_id] = {}
-                    except ValueError:
-                        # Handle old format - this key is actually a message ID
-                        if isinstance(value, dict) and 'guild_id' in value:
-                            clip_guild_id = value.get('guild_id')
-                            if clip_guild_id not in bot.pending_clips:
-                                bot.pending_clips[clip_guild_id] = {}
-                            bot.pending_clips[clip_guild_id][key] = value
-        else:
-            bot.pending_clips = {}
+        bot.pending_clips = load_pending_clips()
     
-    # Start background task to check expired clips
-    bot.loop.create_task(background_check_expired())
+    # Start the expiry scheduler, it settles overdue clips right away
+    expiry_scheduler.start()
+    # Start encoding the submissions queued before a restart
+    job_queue.start()
     # Put back the views so we can votes even if the bot dc for a seconds, we didn't lose states
     bot.loop.create_task(register_persistent_views())
 
-async def background_check_expired():
-    """Background task to check for expired clips every minute"""
-    while True:
-        try:
-            await check_expired_clips()
-        except Exception as e:
-            print(f"Error checking expired clips: {e}")
-        await asyncio.sleep(60)  # Check every minute
-
 @bot.event
 async def on_raw_reaction_add(payload):
     if payload.user_id == bot.user.id:
         return
 
+    # Fires for every reaction of every server, drop anything that isn't a moderation decision
+    if not reaction_filter.accepts(payload):
+        return
+
     guild = bot.get_guild(payload.guild_id)
     if not guild:
         return Exception
 
+    # Check if this is the moderation channel for this specific server
+    check_channel_id, guess_channel_id, _ = channels.ids(guild)
+    if payload.channel_id != check_channel_id:
+        return
+
     channel = guild.get_channel(payload.channel_id)
     if not channel:
         return Exception
 
-    # Check if this is a moderation channel for this specific server
-    check_channel_name, guess_channel_name, results_channel_name = get_channel_names(guild.id)
-    if channel.name != check_channel_name:
-        return
-
     message_id = payload.message_id
-    
-    # Check server-specific pending clips
-    if not hasattr(bot, 'pending_clips'):
-        bot.pending_clips = {}
-
-    if guild.id not in bot.pending_clips:
-        # Try to load from file for this server
-        if os.path.exists(CLIP_DATA_FILE):
-            with open(CLIP_DATA_FILE, 'r') as f:
-                all_clips = json.load(f)
-                bot.pending_clips = {}
-                # Convert string keys to int for guild IDs and handle migration
-                for key, value in all_clips.items():
-                    try:
-                        server_id = int(key)
-                        if isinstance(value, dict):
-                            # Check if this looks like a server container
-                            if any(isinstance(v, dict) and 'rank' in v for v in value.values()):
-                                bot.pending_clips[server_id] = value
-                            else:
-                                bot.pending_clips[server_id] = {}
-                        else:
-                            bot.pending_clips[server_id] = {}
-                    except ValueError:
-                        # This is an old format message ID at root level
-                        if isinstance(value, dict) and 'guild_id' in value:
-                            clip_guild_id = value.get('guild_id')
-                            if clip_guild_id not in bot.pending_clips:
-                                bot.pending_clips[clip_guild_id] = {}
-                            bot.pending_clips[clip_guild_id][key] = value
-        else:
-            bot.pending_clips[guild.id] = {}
         
     # Check if this message has clip data for this server
     if guild.id not in bot.pending_clips or str(message_id) not in bot.pending_clips[guild.id]:
@@ -2027,7 +4067,7 @@ async def on_raw_reaction_add(payload):
     check_channel = channel
     
     # Find the guess channel for this server
-    guess_channel = discord.utils.get(guild.channels, name=guess_channel_name)
+    guess_channel = guild.get_channel(guess_channel_id) if guess_channel_id else None
     if not guess_channel:
         return
 
@@ -2036,7 +4076,8 @@ async def on_raw_reaction_add(payload):
         try:
             # Get video content
             video_content = None
-            video_url = clip_data.get('video_url')
+            # Fresh link, Discord hosted ones expire
+            video_url = await hosting.current_url(clip_data.get('hosting'), clip_data.get('video_url'))
             
             if video_url:
                 # External hosting - create embed
@@ -2056,13 +4097,6 @@ async def on_raw_reaction_add(payload):
                     # Re-upload the video to guess channel
                     attachment = message.attachments[0]
                     
-                    # Download the attachment
-                    video_data = await attachment.read()
-                    video_file = discord.File(
-                        io.BytesIO(video_data), 
-                        filename=attachment.filename
-                    )
-                    
                     embed = discord.Embed(
                         title="🎮 Guess the Rank!",
                         description="Watch the video and guess what rank this player is!",
@@ -2072,7 +4106,7 @@ async def on_raw_reaction_add(payload):
                     embed.add_field(name="📊 Current Votes", value="0", inline=True)
                     embed.set_footer(text="Select your guess from the dropdown below!")
                     
-                    guess_message = await guess_channel.send(embed=embed, file=video_file)
+                    guess_message = await repost_attachment(attachment, guess_channel, embed=embed)
                 else:
                     await check_channel.send("❌ Error: No video found in the original message.")
                     return
@@ -2089,20 +4123,23 @@ async def on_raw_reaction_add(payload):
             if guild.id not in results_data:
                 results_data[guild.id] = {}
                 
+            end_time = datetime.now() + timedelta(hours=24)
             results_data[guild.id][clip_id] = {
                 'correct_rank': clip_data['rank'],
                 'votes': {},
                 'total_votes': 0,
                 'correct_votes': 0,
                 'created_time': datetime.now().isoformat(),
-                'end_time': (datetime.now() + timedelta(hours=24)).isoformat(),
+                'end_time': end_time.isoformat(),
                 'expired': False,
-                'video_url': clip_data.get('video_url'),
+                'video_url': video_url,
+                'hosting': clip_data.get('hosting'),
                 'submitter_id': clip_data['user_id'],
                 'message_id': guess_message.id,
                 'guild_id': guild.id
             }
-            save_results_data(results_data)
+            save_results_data(results_data, guild.id, [clip_id])
+            expiry_scheduler.schedule(guild.id, clip_id, end_time)
 
             # Notify submitter of approval
             try:
@@ -2141,8 +4178,7 @@ async def on_raw_reaction_add(payload):
 
         # Remove from pending clips for this server
         del bot.pending_clips[guild.id][str(message_id)]
-        with open(CLIP_DATA_FILE, 'w') as f:
-            json.dump(bot.pending_clips, f, indent=2)
+        save_pending_clips(guild.id)
 
     elif str(payload.emoji) == "❌":
         # Rejection - ask for reason
@@ -2171,9 +4207,9 @@ async def on_raw_reaction_add(payload):
                         await message.delete()
                     except:
                         pass
-                    del bot.pending_clips[guild.id][message_id]
-                    with open(CLIP_DATA_FILE, 'w') as f:
-                        json.dump(bot.pending_clips, f, indent=2)
+                    await hosting.discard(clip_data.get('hosting'))
+                    del bot.pending_clips[guild.id][str(message_id)]
+                    save_pending_clips(guild.id)
                     return
                 except Exception as e:
                     await check_channel.send(f"❗ Error fetching user: {str(e)}")
@@ -2212,11 +4248,11 @@ async def on_raw_reaction_add(payload):
             await message.delete()
         except:
             pass
+        await hosting.discard(clip_data.get('hosting'))
 
         # Clean up server-specific clip record
         del bot.pending_clips[guild.id][str(message_id)]
-        with open(CLIP_DATA_FILE, 'w') as f:
-            json.dump(bot.pending_clips, f, indent=2)
+        save_pending_clips(guild.id)
 @bot.event
 async def on_message(message):
     # Ignore bot messages
@@ -2254,12 +4290,32 @@ async def on_message(message):
                     break
         
         if video_path:
+            # Reject bad files now, before the user picks a rank and waits in the queue
+            try:
+                content_key = await validate_video(video_path)
+            except UnsupportedResolutionError as e:
+                print(f"❌ [RESOLUTION] User {message.author.name} submitted unsupported resolution: {e.width}x{e.height}")
+                await message.reply(
+                    f"❌ **Video resolution not supported: {e.width}x{e.height}**\n\n"
+                    f"**Supported resolutions:**\n"
+                    f"• Landscape clips of at least 1280x720 (720p)\n"
+                    f"• 4:3 up to 32:9 ultrawide, above 1080p is downscaled automatically\n\n"
+                    f"Please convert your video and submit again."
+                )
+                await message.remove_reaction('⏳', bot.user)
+                cleanup_files([video_path])
+                return
+            except InvalidVideoError as e:
+                await message.reply(f"❌ {e}")
+                await message.remove_reaction('⏳', bot.user)
+                cleanup_files([video_path])
+                return
+
             # Find all servers with configured channels
             available_servers = []
             for guild in bot.guilds:
-                check_channel_name, guess_channel_name, _ = get_channel_names(guild.id)
-                check_channel = discord.utils.get(guild.channels, name=check_channel_name)
-                guess_channel = discord.utils.get(guild.channels, name=guess_channel_name)
+                check_channel = channels.check_channel(guild)
+                guess_channel = channels.guess_channel(guild)
                 
                 if check_channel and guess_channel:
                     available_servers.append({
@@ -2275,7 +4331,7 @@ async def on_message(message):
             elif len(available_servers) == 1:
                 # Only one server available, use it directly
                 selected_server = available_servers[0]
-                view = RankSelector(message.author.id, video_path, selected_server['guild'].id)
+                view = RankSelector(message.author.id, video_path, selected_server['guild'].id, content_key)
                 
                 embed = discord.Embed(
                     title="🎮 Rank Selection",
@@ -2287,7 +4343,7 @@ async def on_message(message):
                 await message.reply(embed=embed, view=view)
             else:
                 # Multiple servers available, let user choose
-                view = ServerSelector(message.author.id, video_path, available_servers)
+                view = ServerSelector(message.author.id, video_path, available_servers, content_key)
                 
                 embed = discord.Embed(
                     title="🎮 Server Selection",
@@ -2303,8 +4359,7 @@ async def on_message(message):
             # Show available servers in help message
             server_list = []
             for guild in bot.guilds:
-                check_channel_name, guess_channel_name, _ = get_channel_names(guild.id)
-                check_channel = discord.utils.get(guild.channels, name=check_channel_name)
+                check_channel = channels.check_channel(guild)
                 if check_channel:
                     server_list.append(f"• **{guild.name}**")
             
@@ -2387,9 +4442,13 @@ async def show_scoreboard(interaction: discord.Interaction, page: int = 1):
         return
     
     guild_id = interaction.guild.id
-    scores_data = load_user_scores()
     
-    if guild_id not in scores_data or not scores_data[guild_id]:
+    # Calculate pagination
+    users_per_page = 10
+    start_idx = (page - 1) * users_per_page
+    total_users, page_users = leaderboard.page(guild_id, start_idx, users_per_page)
+    
+    if total_users == 0:
         embed = discord.Embed(
             title="🏆 Server Scoreboard",
             description="No scores recorded yet! Play some rounds to see rankings.",
@@ -2398,13 +4457,6 @@ async def show_scoreboard(interaction: discord.Interaction, page: int = 1):
         await interaction.response.send_message(embed=embed)
         return
     
-    # Sort users by total score
-    all_users = list(scores_data[guild_id].values())
-    all_users.sort(key=lambda x: x['total_score'], reverse=True)
-    
-    # Calculate pagination
-    users_per_page = 10
-    total_users = len(all_users)
     total_pages = (total_users + users_per_page - 1) // users_per_page  # Ceiling division
     
     # Validate page number
@@ -2415,10 +4467,7 @@ async def show_scoreboard(interaction: discord.Interaction, page: int = 1):
         )
         return
     
-    # Get users for this page
-    start_idx = (page - 1) * users_per_page
     end_idx = min(start_idx + users_per_page, total_users)
-    page_users = all_users[start_idx:end_idx]
     
     embed = discord.Embed(
         title=f"🏆 Server Scoreboard - Page {page}/{total_pages}",
@@ -2470,9 +4519,10 @@ async def show_profile(interaction: discord.Interaction, user: discord.Member =
     """Show profile for yourself or another user"""
     target_user = user or interaction.user
     guild_id = interaction.guild.id
-    scores_data = load_user_scores()
+    # Served from the leaderboard index, the shard holds every player's full history
+    user_data = leaderboard.profile(guild_id, target_user.id)
     
-    if guild_id not in scores_data or str(target_user.id) not in scores_data[guild_id]:
+    if user_data is None:
         if target_user == interaction.user:
             embed = discord.Embed(
                 title="📊 Your Profile",
@@ -2488,24 +4538,8 @@ async def show_profile(interaction: discord.Interaction, user: discord.Member =
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    user_data = scores_data[guild_id][str(target_user.id)]
-    
     # Calculate leaderboard position using user ID instead of username
-    all_users_with_ids = []
-    for user_id_str, user_stats in scores_data[guild_id].items():
-        all_users_with_ids.append({
-            'user_id': user_id_str,
-            'stats': user_stats
-        })
-    
-    # Sort by total score
-    all_users_with_ids.sort(key=lambda x: x['stats']['total_score'], reverse=True)
-    
-    leaderboard_position = None
-    for i, user_entry in enumerate(all_users_with_ids, 1):
-        if user_entry['user_id'] == str(target_user.id):
-            leaderboard_position = i
-            break
+    leaderboard_position, total_players = leaderboard.rank(guild_id, target_user.id)
     
     # Fallback if somehow still not found
     if leaderboard_position is None:
@@ -2520,7 +4554,7 @@ async def show_profile(interaction: discord.Interaction, user: discord.Member =
     current_streak = user_data['current_streak']
     best_streak = user_data['best_streak']
     accuracy = (correct_guesses / games_played * 100) if games_played > 0 else 0
-    history = user_data.get('history', [])
+    history = user_data['recent_history']
     
     # Create embed
     title = f"📊 {username}'s Profile" if target_user != interaction.user else "📊 Your Profile"
@@ -2530,7 +4564,7 @@ async def show_profile(interaction: discord.Interaction, user: discord.Member =
     embed.add_field(
         name="🏆 Overall Stats",
         value=f"**Score:** {total_score} points\n"
-              f"**Rank:** #{leaderboard_position}/{len(all_users_with_ids)}\n"
+              f"**Rank:** #{leaderboard_position}/{total_players}\n"
               f"**Games:** {games_played}\n"
               f"**Accuracy:** {accuracy:.1f}% ({correct_guesses} correct)",
         inline=True
@@ -2605,7 +4639,7 @@ async def help_slash_command(interaction: discord.Interaction):
         name="🎬 Supported video sources:",
         value="• Direct file upload (up to 150MB)\n"
               "• Catbox.moe links\n"
-              "• 1920x1080 or 1280x720 only\n"
+              "• 720p or higher, up to 32:9 ultrawide\n"
               "• Formats: MP4, AVI, MOV, MKV, WMV, FLV, WEBM",
         inline=False
     )
@@ -2635,13 +4669,9 @@ async def show_results(interaction: discord.Interaction):
     """Show results browser for finished clips in this server"""
     
     guild_id = interaction.guild.id
-    results_data = load_results_data()
     
     # Check if this server has any results
-    finished_clips = []
-    if guild_id in results_data:
-        server_clips = results_data[guild_id]
-        finished_clips = [clip_id for clip_id, clip_data in server_clips.items() if clip_data.get('expired', False)]
+    finished_clips = results_store.finished_clips(guild_id, limit=1)
     
     if not finished_clips:
         embed = discord.Embed(
@@ -2711,15 +4741,17 @@ async def cleanup_expired(interaction: discord.Interaction, count: int = 5):
         
         # Delete the clips from this server only
         deleted_info = []
+        deleted_ids = []
         for clip in clips_to_delete:
             clip_id = clip['clip_id']
             if clip_id in server_clips:
                 del server_clips[clip_id]
+                deleted_ids.append(clip_id)
                 deleted_info.append(f"• {clip['end_time'].strftime('%Y-%m-%d %H:%M')} - {clip['rank']} ({clip['votes']} votes)")
         
         # Save updated data
         results_data[guild_id] = server_clips
-        save_results_data(results_data)
+        save_results_data(results_data, guild_id, deleted_ids)
         
         # Create response
         embed = discord.Embed(
@@ -2748,6 +4780,65 @@ async def cleanup_expired(interaction: discord.Interaction, count: int = 5):
         await interaction.followup.send(f"❌ Error during cleanup: {str(e)}", ephemeral=True)
         print(f"Cleanup error: {e}")
         
+@tree.command(name="stats", description="Show bot load counters")
+async def show_stats(interaction: discord.Interaction):
+    """Show event filtering counters (Admin only)"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+        return
+    
+    total = reaction_filter.filtered + reaction_filter.handled
+    filtered_pct = (reaction_filter.filtered / total * 100) if total else 0
+    
+    embed = discord.Embed(title="📈 Bot Stats", color=0x7AB0E7)
+    embed.add_field(
+        name="Reactions",
+        value=f"Handled: **{reaction_filter.handled}**\n"
+              f"Filtered: **{reaction_filter.filtered}** ({filtered_pct:.1f}%)\n"
+              f"Pending moderation: **{len(reaction_filter.message_ids)}**",
+        inline=False
+    )
+    average_wait = job_queue.average_wait()
+    stage_text = ", ".join(f"{stage} **{queued}**/**{running}**" for stage, (queued, running) in job_queue.stage_counts().items())
+    embed.add_field(
+        name="Processing queue",
+        value=f"Queued: **{job_queue.depth()}**, running: **{job_queue.running()}** / {transcode_pool.workers}\n"
+              f"Stages (queued/running): {stage_text}\n"
+              f"Oldest waiting: **{job_queue.oldest_wait() / 60:.1f} min**\n"
+              f"Average wait: **{f'{average_wait / 60:.1f} min' if average_wait is not None else 'n/a'}**",
+        inline=False
+    )
+    upload_rate = upload_manager.average_rate()
+    embed.add_field(
+        name="Uploads",
+        value=f"Uploading: **{upload_manager.active}** / {upload_manager.workers}, waiting: **{upload_manager.waiting}**\n"
+              f"Succeeded: **{upload_manager.succeeded}**, failed: **{upload_manager.failed}**, retries: **{upload_manager.retries}**\n"
+              f"Throughput: **{f'{upload_rate:.2f} MB/s' if upload_rate is not None else 'n/a'}** "
+              f"({upload_manager.bytes_sent / (1024 * 1024):.0f}MB sent)\n"
+              f"Backends: {', '.join(backend.name for backend in hosting.backends)}"
+              + (f" (uploads: {', '.join(f'{name} {count}' for name, count in upload_manager.by_backend.items())})" if upload_manager.by_backend else ""),
+        inline=False
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# Keep the channel registry in sync with the guild's channels
+@bot.event
+async def on_guild_channel_create(channel):
+    channels.invalidate(channel.guild.id)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    channels.invalidate(channel.guild.id)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    if before.name != after.name:
+        channels.invalidate(after.guild.id)
+
+@bot.event
+async def on_guild_remove(guild):
+    channels.invalidate(guild.id, names=True)
+        
 # Error handling
 @bot.event
 async def on_command_error(ctx, error):
@@ -2765,6 +4856,26 @@ async def on_error(event, *args, **kwargs):
     traceback.print_exc()
 
 if __name__ == "__main__":
+    if '--recompute-scores' in sys.argv:
+        # Offline maintenance, run it while the bot is stopped
+        storage.migrate_legacy_files()
+        results_store.load()
+        vote_journal.open(results_store.data)
+        recomputed = recompute_all_scores(force='--force' in sys.argv)
+        storage.close()
+        exit(0 if recomputed else 1)
+    if '--benchmark-blur' in sys.argv:
+        # python main.py --benchmark-blur clip1.mp4 [clip2.mp4 ...]
+        asyncio.run(benchmark_blur(sys.argv[sys.argv.index('--benchmark-blur') + 1:]))
+        exit(0)
+    if '--check-blur' in sys.argv:
+        # python main.py --check-blur clip1.mp4 [clip2.mp4 ...], exits with 1 when the engines don't match
+        exit(0 if asyncio.run(check_blur_equivalence(sys.argv[sys.argv.index('--check-blur') + 1:])) else 1)
+    if '--memcheck-approval' in sys.argv:
+        # python main.py --memcheck-approval [size_mb], exits with 1 when memory grows with the clip size
+        memcheck_args = sys.argv[sys.argv.index('--memcheck-approval') + 1:]
+        exit(0 if asyncio.run(memcheck_approval(int(memcheck_args[0]) if memcheck_args else 200)) else 1)
+    
     # Dependency checks
     try:
         import cv2